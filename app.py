@@ -6,21 +6,23 @@ Mantiene SQLite, todas las funciones (CRUD, stock, búsqueda combinada, gráfico
 Estilo: Dashboard moderno (sidebar navigation).
 """
 
+import os
+import atexit
+import threading
 import streamlit as st
-from datetime import datetime
-from io import BytesIO
 import pandas as pd
 
 # Importa tu lógica existente
 from inventario import Inventario
 from producto import Producto
+from exportador import csv_temporal, excel_temporal, pdf_temporal
 
 # Utilidades de export (usa el export_utils.py que ya te di; si no existe lo implementé abajo)
 try:
     from export_utils import export_to_csv, export_to_excel, export_to_pdf
 except Exception:
     # fallback mínimo si no existe (crea CSV in-memory)
-    import csv, os
+    import csv
     def export_to_csv(rows, path):
         with open(path, 'w', newline='', encoding='utf-8') as f:
             if not rows:
@@ -53,77 +55,149 @@ except Exception:
     HAS_PLOTLY = False
 
 # Instancia del inventario (usa la DB por defecto)
-inv = Inventario()
+@st.cache_resource
+def obtener_inventario():
+    """Inventario compartido por todas las sesiones: se crea una sola vez por proceso"""
+    return Inventario()
+
+inv = obtener_inventario()
+# En cada rerun solo se verifica la conexión; se reconecta si quedó inválida
+inv.bd.verificar_conexion()
+# Versión de los datos con la que se dibuja este rerun (si otro proceso escribió, se descarta la caché)
+version_datos = inv.bd.version_datos()
+st.session_state["version_datos"] = version_datos
 
 # -----------------------------------
 # Helpers: convertir listas de objetos a DataFrame / bytes
 # -----------------------------------
+# Campo de Producto → columna mostrada, en el orden de las tablas de la app
+COLUMNAS_DF = {"id": "ID", "nombre": "Nombre", "tipo_tela": "TipoTela",
+               "talla": "Talla", "color": "Color", "cantidad": "Stock"}
+
 def productos_to_df(productos):
-    """Convierte lista de Producto a DataFrame"""
-    rows = []
-    for p in productos:
-        rows.append({
-            "ID": p.id,
-            "Nombre": p.nombre,
-            "TipoTela": p.tipo_tela,
-            "Talla": p.talla,
-            "Color": p.color,
-            "Stock": p.cantidad
-        })
-    return pd.DataFrame(rows)
+    """Convierte lista de Producto a DataFrame (Producto es una tupla: no hay conversión por fila)"""
+    df = pd.DataFrame.from_records(productos, columns=Producto._fields)
+    return df[list(COLUMNAS_DF)].rename(columns=COLUMNAS_DF)
 
 def df_to_csv_bytes(df):
     return df.to_csv(index=False).encode('utf-8')
 
-def df_to_excel_bytes(df):
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Inventario')
-    out.seek(0)
-    return out.getvalue()
+@st.cache_resource
+def exportaciones_en_disco():
+    """Último archivo generado de cada exportación, compartido por las sesiones
 
-def df_to_pdf_bytes(rows):
+    Devuelve (archivos, bloqueos, bloqueo): archivos es clave -> (version, ruta),
+    bloqueos tiene un bloqueo por clave para que una misma exportación no se genere dos
+    veces a la vez sin frenar a las demás, y bloqueo protege solo a esos diccionarios.
+    Los archivos que queden se borran al terminar el proceso.
     """
-    Crea un PDF in-memory usando fpdf2 si está disponible.
-    Si no, lanza error para que el calling function muestre mensaje.
+    archivos, bloqueos = {}, {}
+
+    def borrar_archivos():
+        for _, ruta in archivos.values():
+            if os.path.exists(ruta):
+                os.remove(ruta)
+    atexit.register(borrar_archivos)
+    return archivos, bloqueos, threading.Lock()
+
+def archivo_exportacion(clave, version, generar):
+    """Abre el archivo de la exportación clave para la versión actual de los datos
+
+    generar() crea el archivo temporal y devuelve su ruta; solo se llama si no hay uno
+    de esta versión. Por exportación se guarda en disco solo el último archivo (el de la
+    versión anterior se borra), así la memoria no crece con el tamaño ni con las sesiones.
     """
+    archivos, bloqueos, bloqueo = exportaciones_en_disco()
+    with bloqueo:
+        bloqueo_clave = bloqueos.setdefault(clave, threading.Lock())
+    # Solo esperan las sesiones que piden esta misma exportación
+    with bloqueo_clave:
+        guardado = archivos.get(clave)
+        if guardado is None or guardado[0] != version or not os.path.exists(guardado[1]):
+            ruta = generar()
+            archivos[clave] = (version, ruta)
+            if guardado is not None and os.path.exists(guardado[1]):
+                os.remove(guardado[1])
+        # Abierto dentro del bloqueo: aunque luego se borre, la descarga puede leerlo
+        return open(archivos[clave][1], 'rb')
+
+def exportacion_pdf(modo, agrupar_por, barra):
+    """Genera el informe PDF mostrando el avance en barra (fuera de cualquier caché de Streamlit)"""
+    def progreso(filas, total):
+        if total:
+            barra.progress(min(1.0, filas / total), text=f"Generando PDF: {filas} de {total} productos")
     try:
-        from fpdf import FPDF
+        return pdf_temporal(inv.bd, modo=modo, agrupar_por=agrupar_por, progreso=progreso)
+    finally:
+        barra.empty()
+
+def exportacion_bajo_demanda(formato, opciones, generar, file_name, mime):
+    """Muestra "Preparar <formato>" y, una vez pedido, el botón de descarga
+
+    El archivo se genera solo al pedirlo y se reutiliza mientras no cambie la versión de
+    los datos (en ningún proceso) ni las opciones. Si falta una librería opcional se
+    muestra cómo instalarla; cualquier otro error se muestra tal cual.
+    """
+    clave = f"exportar_{formato}"
+    if st.session_state.get(clave) != version_datos:
+        if not st.button(f"Preparar {formato}", key=f"preparar_{formato}"):
+            return
+        st.session_state[clave] = version_datos
+    try:
+        with st.spinner(f"Generando {formato}..."):
+            archivo = archivo_exportacion((formato, opciones), version_datos, generar)
+    except (ImportError, RuntimeError) as e:
+        # Los exportadores avisan así que falta fpdf2/openpyxl ("Instala ...")
+        st.warning(str(e))
+        return
     except Exception as e:
-        raise RuntimeError("fpdf2 no instalado")
-    pdf = FPDF(orientation='L', unit='mm', format='A4')
-    pdf.set_auto_page_break(auto=True, margin=8)
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(0, 8, txt="Inventario - Exportado: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S"), ln=True)
-    if not rows:
-        pdf.ln(4)
-        pdf.cell(0, 8, txt="No hay datos", ln=True)
-        out = BytesIO()
-        pdf.output(out)
-        out.seek(0)
-        return out.read()
-    cols = list(rows[0].keys())
-    page_width = 287
-    col_w = max(20, int(page_width / max(1, len(cols))) - 4)
-    # header
-    pdf.set_font("Arial", "B", 10)
-    for c in cols:
-        pdf.cell(col_w, 8, txt=str(c), border=1, align='C')
-    pdf.ln()
-    # rows
-    pdf.set_font("Arial", size=9)
-    for r in rows:
-        for c in cols:
-            text = str(r.get(c, ""))
-            if len(text) > 30:
-                text = text[:27] + "..."
-            pdf.cell(col_w, 8, txt=text, border=1)
-        pdf.ln()
-    out = BytesIO()
-    pdf.output(out)
-    out.seek(0)
-    return out.read()
+        st.error(f"No se pudo generar el {formato}: {e}")
+        return
+    with archivo:
+        st.download_button(f"📥 Descargar {formato}", data=archivo, file_name=file_name, mime=mime)
+
+def paginar_productos(clave):
+    """Muestra controles de paginación y devuelve solo los productos de la página visible
+
+    Avanza por clave (keyset) guardando en session_state la última fila de cada página;
+    "Ir a página" salta con OFFSET y desde ahí vuelve a avanzar por clave.
+    """
+    estado = st.session_state.setdefault(f"pag_{clave}", {
+        'config': None, 'cursores': [None], 'base': 0, 'siguiente': None
+    })
+    c1, c2, c3 = st.columns([2, 1, 1])
+    orden = c1.selectbox("Ordenar por", ['nombre', 'id', 'tipo_tela', 'talla', 'cantidad'], key=f"orden_{clave}")
+    tamano = c2.selectbox("Filas por página", [25, 50, 100, 250], index=1, key=f"tamano_{clave}")
+    descendente = c3.checkbox("Descendente", key=f"desc_{clave}")
+    if estado['config'] != (orden, tamano, descendente):
+        estado.update(config=(orden, tamano, descendente), cursores=[None], base=0, siguiente=None)
+
+    total = inv.bd.contar_productos()
+    paginas = max(1, -(-total // tamano))
+
+    b1, b2, b3, b4 = st.columns([1, 1, 1, 2])
+    if b1.button("◀ Anterior", key=f"ant_{clave}"):
+        if len(estado['cursores']) > 1:
+            estado['cursores'].pop()
+        elif estado['base'] > 0:
+            estado['base'] -= 1
+    if b2.button("Siguiente ▶", key=f"sig_{clave}") and estado['siguiente'] is not None:
+        estado['cursores'].append(estado['siguiente'])
+    ir_a = b4.number_input("Ir a página", min_value=1, max_value=paginas, value=1, step=1, key=f"ir_{clave}")
+    if b3.button("Ir", key=f"btn_ir_{clave}"):
+        estado.update(cursores=[None], base=int(ir_a) - 1)
+
+    despues = estado['cursores'][-1]
+    productos = inv.bd.obtener_pagina(
+        orden, tamano, despues=despues,
+        desplazamiento=0 if despues is not None else estado['base'] * tamano,
+        descendente=descendente
+    )
+    # Clave para la página siguiente (None si esta es la última)
+    estado['siguiente'] = inv.bd.clave_pagina(productos[-1], orden) if len(productos) == tamano else None
+    pagina = estado['base'] + len(estado['cursores'])
+    st.caption(f"Página {pagina} de {paginas} — {total} productos")
+    return productos, total
 
 # -----------------------------------
 # UI: Sidebar navigation
@@ -134,6 +208,36 @@ st.sidebar.caption("Dashboard — Gestión y reportes")
 
 menu = st.sidebar.radio("Ir a", ["Dashboard", "Productos", "Búsqueda", "Estadísticas", "Historial", "Exportar", "Ajustes"])
 
+# Refresco automático: un fragmento consulta solo la versión de los datos y vuelve a
+# ejecutar la app cuando cambió (st.fragment requiere Streamlit >= 1.37)
+if hasattr(st, "fragment"):
+    @st.fragment(run_every=5)
+    def vigilar_cambios():
+        """Vuelve a dibujar la página si otra sesión o proceso cambió los datos"""
+        if inv.bd.version_datos() != st.session_state.get("version_datos"):
+            st.rerun()
+
+    if st.sidebar.checkbox("Actualizar al cambiar los datos", value=False):
+        vigilar_cambios()
+
+with st.sidebar.expander("📥 Importar catálogo"):
+    archivo = st.file_uploader("Archivo CSV o Excel", type=["csv", "xlsx"])
+    st.caption("Columnas: nombre, tipo_tela, talla, cantidad, color")
+    if archivo is not None and st.button("Importar productos"):
+        avance = st.empty()
+        try:
+            reporte = inv.importar_archivo(
+                archivo, progreso=lambda ok, mal: avance.write(f"{ok} importados, {mal} rechazados...")
+            )
+            avance.empty()
+            st.success(f"{reporte['insertadas']} productos importados "
+                       f"({reporte['filas_por_segundo']:.0f} filas/s)")
+            if reporte['rechazadas']:
+                st.warning(f"{len(reporte['rechazadas'])} filas rechazadas")
+                st.dataframe(pd.DataFrame(reporte['rechazadas'][:200], columns=["Fila", "Motivo"]))
+        except Exception as e:
+            st.error(f"No se pudo importar: {e}")
+
 # -----------------------------------
 # Dashboard: resumen con KPIs y gráficos pequeños
 # -----------------------------------
@@ -148,9 +252,8 @@ if menu == "Dashboard":
 
     st.markdown("---")
     st.subheader("Últimos movimientos")
-    hist = inv.bd.obtener_historial(limite=10)
-    if hist:
-        df_hist = pd.DataFrame(hist)
+    df_hist = inv.bd.historial_df(limite=10)
+    if not df_hist.empty:
         st.dataframe(df_hist[['fecha','nombre','tipo_movimiento','cantidad','cantidad_anterior','cantidad_nueva']].rename(columns={
             'fecha':'Fecha','nombre':'Producto','tipo_movimiento':'Movimiento','cantidad':'Cant','cantidad_anterior':'Ant','cantidad_nueva':'Nueva'
         }))
@@ -159,10 +262,8 @@ if menu == "Dashboard":
 
     st.markdown("---")
     st.subheader("Gráficos rápidos")
-    telas = inv.bd.resumen_por_tela()
-    tallas = inv.bd.resumen_por_talla()
-    df_telas = pd.DataFrame(telas, columns=['Tela','Total']) if telas else pd.DataFrame(columns=['Tela','Total'])
-    df_tallas = pd.DataFrame(tallas, columns=['Talla','Total']) if tallas else pd.DataFrame(columns=['Talla','Total'])
+    df_telas = inv.bd.resumen_df('tela').rename(columns={'valor': 'Tela', 'total': 'Total'})
+    df_tallas = inv.bd.resumen_df('talla').rename(columns={'valor': 'Talla', 'total': 'Total'})
 
     if HAS_PLOTLY:
         if not df_telas.empty:
@@ -198,14 +299,20 @@ elif menu == "Productos":
                         st.error("Error al agregar producto.")
     st.markdown("---")
 
-    st.subheader("Editar / actualizar stock / eliminar")
-    productos = inv.bd.obtener_todos(ordenar_por='nombre')
+    st.subheader("Productos")
+    productos, total_productos = paginar_productos("productos")
     df_prod = productos_to_df(productos)
+    st.dataframe(df_prod)
+
+    st.markdown("---")
+    st.subheader("Editar / actualizar stock / eliminar")
     if df_prod.empty:
         st.info("No hay productos. Agrega uno primero.")
     else:
-        # Selección de producto por ID
-        sel_id = st.selectbox("Selecciona producto (ID) para editar/stock", options=[p.id for p in productos])
+        # Selección de producto por ID (entre los de la página visible)
+        nombres = {p.id: p.nombre for p in productos}
+        sel_id = st.selectbox("Selecciona producto (ID) para editar/stock", options=list(nombres),
+                              format_func=lambda i: f"{i} — {nombres[i]}")
         p_obj = inv.bd.buscar_por_id(sel_id)
         if p_obj:
             colA, colB = st.columns([2,1])
@@ -257,14 +364,55 @@ elif menu == "Productos":
                     st.error("No se pudo actualizar")
 
     st.markdown("---")
-    st.subheader("Todos los productos")
-    st.dataframe(df_prod)
+    st.subheader("Movimientos en lote")
+    st.caption("Una fila por movimiento: cantidad positiva para entradas, negativa para salidas.")
+    with st.form("form_lote"):
+        df_lote = st.data_editor(
+            pd.DataFrame({"ID": pd.Series(dtype="Int64"), "Cantidad": pd.Series(dtype="Int64"), "Tipo": pd.Series(dtype="str")}),
+            num_rows="dynamic",
+            column_config={
+                "Tipo": st.column_config.SelectboxColumn("Tipo", options=["ENTRADA", "SALIDA", "AJUSTE"]),
+            },
+            key="editor_lote",
+        )
+        todo_o_nada = st.checkbox("Todo o nada (si un movimiento falla no se aplica ninguno)", value=True)
+        aplicar_lote = st.form_submit_button("Aplicar movimientos")
+        if aplicar_lote:
+            filas = df_lote.dropna(subset=["ID", "Cantidad"])
+            movimientos = [(int(f["ID"]), int(f["Cantidad"]), f["Tipo"] if isinstance(f["Tipo"], str) else None)
+                           for _, f in filas.iterrows()]
+            if not movimientos:
+                st.warning("Agrega al menos un movimiento con ID y cantidad.")
+            else:
+                reporte = inv.aplicar_movimientos(movimientos, todo_o_nada=todo_o_nada)
+                if reporte['ok']:
+                    st.success(f"{reporte['aplicados']} movimientos aplicados")
+                else:
+                    if reporte['aplicados']:
+                        st.warning(f"{reporte['aplicados']} movimientos aplicados, {len(reporte['rechazados'])} rechazados")
+                    else:
+                        st.error("No se aplicó ningún movimiento")
+                    st.dataframe(pd.DataFrame(
+                        [(i + 1, pid, motivo) for i, pid, motivo in reporte['rechazados']],
+                        columns=["Fila", "ID", "Motivo"]
+                    ))
+
 
 # -----------------------------------
 # Búsqueda: filtros combinados
 # -----------------------------------
 elif menu == "Búsqueda":
-    st.title("🔍 Búsqueda combinada")
+    st.title("🔍 Búsqueda")
+    with st.form("form_texto"):
+        texto = st.text_input("Buscar por nombre, color o tela", placeholder="p. ej. camisa oxford azul")
+        limite_texto = st.number_input("Máximo de resultados", min_value=10, max_value=500, value=50, step=10)
+        buscar_txt = st.form_submit_button("Buscar texto")
+        if buscar_txt and texto.strip():
+            encontrados = inv.bd.buscar_texto(texto, int(limite_texto))
+            st.success(f"Se encontraron {len(encontrados)} resultados")
+            st.dataframe(productos_to_df(encontrados))
+
+    st.subheader("Búsqueda combinada")
     with st.form("form_search"):
         tela = st.selectbox("Tipo de tela", options=['', 'algodón','poliéster','lino','seda','denim','lycra'])
         talla = st.selectbox("Talla", options=['', 'XS','S','M','L','XL','XXL','28','30','32','34','36'])
@@ -278,9 +426,10 @@ elif menu == "Búsqueda":
                 except ValueError:
                     st.error("Stock mínimo debe ser entero")
                     stock_val = None
-            results = inv.bd.buscar_combinado(tipo_tela=(tela or None), talla=(talla or None), stock_minimo=stock_val)
-            df_r = productos_to_df(results)
-            st.success(f"Se encontraron {len(results)} resultados")
+            df_r = inv.bd.productos_df(ordenar_por='nombre', tipo_tela=(tela or None), talla=(talla or None),
+                                       stock_minimo=stock_val)
+            df_r = df_r[list(COLUMNAS_DF)].rename(columns=COLUMNAS_DF)
+            st.success(f"Se encontraron {len(df_r)} resultados")
             st.dataframe(df_r)
             # boton de descarga de resultados como CSV
             csv_bytes = df_to_csv_bytes(df_r)
@@ -299,8 +448,8 @@ elif menu == "Estadísticas":
     st.metric("Sin stock", stats.get('sin_stock',0))
 
     # Data para graficar
-    df_telas = pd.DataFrame(inv.bd.resumen_por_tela(), columns=['Tela','Total']) if inv.bd.resumen_por_tela() else pd.DataFrame(columns=['Tela','Total'])
-    df_tallas = pd.DataFrame(inv.bd.resumen_por_talla(), columns=['Talla','Total']) if inv.bd.resumen_por_talla() else pd.DataFrame(columns=['Talla','Total'])
+    df_telas = inv.bd.resumen_df('tela').rename(columns={'valor': 'Tela', 'total': 'Total'})
+    df_tallas = inv.bd.resumen_df('talla').rename(columns={'valor': 'Talla', 'total': 'Total'})
 
     if HAS_PLOTLY:
         if not df_telas.empty:
@@ -317,25 +466,45 @@ elif menu == "Estadísticas":
 # -----------------------------------
 elif menu == "Historial":
     st.title("📜 Historial de movimientos")
-    filtro_id = st.text_input("Filtrar por ID de producto (opcional)")
+    f1, f2, f3 = st.columns(3)
+    filtro_id = f1.text_input("Filtrar por ID de producto (opcional)")
+    filtro_tipo = f2.selectbox("Tipo de movimiento", ['', 'ENTRADA', 'SALIDA', 'AJUSTE', 'ALTA'])
+    rango = f3.date_input("Rango de fechas (opcional)", value=())
+    incluir_archivo = st.checkbox("Incluir movimientos archivados")
     try:
-        limite = int(st.sidebar.number_input("Limite de registros", value=200, min_value=10, max_value=1000))
+        limite = int(st.sidebar.number_input("Registros por página", value=200, min_value=10, max_value=1000))
     except Exception:
         limite = 200
 
+    pid = None
     if filtro_id.strip():
         try:
             pid = int(filtro_id)
-            hist = inv.bd.obtener_historial(producto_id=pid, limite=limite)
-            st.subheader(f"Historial producto ID {pid}")
         except ValueError:
             st.error("ID inválido")
-            hist = []
-    else:
-        hist = inv.bd.obtener_historial(limite=limite)
-        st.subheader(f"Últimos {len(hist)} movimientos")
-    if hist:
-        df_hist = pd.DataFrame(hist)
+    desde = rango[0] if len(rango) > 0 else None
+    hasta = rango[1] if len(rango) > 1 else desde
+
+    # Paginación por cursor (fecha, id): se reinicia al cambiar cualquier filtro
+    filtros = (pid, filtro_tipo, desde, hasta, limite, incluir_archivo)
+    estado = st.session_state.setdefault("pag_historial", {'filtros': None, 'cursores': [None], 'siguiente': None})
+    if estado['filtros'] != filtros:
+        estado.update(filtros=filtros, cursores=[None], siguiente=None)
+
+    b1, b2, _ = st.columns([1, 1, 4])
+    if b1.button("◀ Más recientes") and len(estado['cursores']) > 1:
+        estado['cursores'].pop()
+    if b2.button("Más antiguos ▶") and estado['siguiente'] is not None:
+        estado['cursores'].append(estado['siguiente'])
+
+    df_hist = inv.bd.historial_df(producto_id=pid, limite=limite, desde=desde, hasta=hasta,
+                                  tipo_movimiento=filtro_tipo or None, antes_de=estado['cursores'][-1],
+                                  incluir_archivo=incluir_archivo)
+    estado['siguiente'] = inv.bd.clave_historial(df_hist.iloc[-1]) if len(df_hist) == limite else None
+
+    titulo = f"Historial producto ID {pid}" if pid else "Movimientos"
+    st.subheader(f"{titulo} — página {len(estado['cursores'])}")
+    if not df_hist.empty:
         st.dataframe(df_hist)
     else:
         st.info("No hay movimientos")
@@ -346,29 +515,32 @@ elif menu == "Historial":
 elif menu == "Exportar":
     st.title("📤 Exportar Inventario")
     st.markdown("Exporta inventario completo a CSV / Excel / PDF.")
-    productos = inv.bd.obtener_todos(ordenar_por='nombre')
-    df_prod = productos_to_df(productos)
-    st.dataframe(df_prod)
+    st.subheader("Vista previa")
+    vista_previa, _ = paginar_productos("exportar")
+    st.dataframe(productos_to_df(vista_previa))
 
+    # Cada exportación se genera solo cuando se pide
     col1, col2, col3 = st.columns(3)
     with col1:
-        csv_bytes = df_to_csv_bytes(df_prod)
-        st.download_button("📥 Descargar CSV", data=csv_bytes, file_name="inventario.csv", mime="text/csv")
+        exportacion_bajo_demanda("CSV", (), lambda: csv_temporal(inv.bd, ordenar_por='nombre'),
+                                 "inventario.csv", "text/csv")
     with col2:
-        # Excel
-        try:
-            excel_bytes = df_to_excel_bytes(df_prod)
-            st.download_button("📥 Descargar Excel (.xlsx)", data=excel_bytes, file_name="inventario.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        except Exception as e:
-            st.warning("Para exportar Excel instala pandas + openpyxl (pip install pandas openpyxl)")
+        resumen_excel = st.checkbox("Incluir hojas de resumen", value=True)
+        movimientos_excel = st.number_input("Movimientos recientes a incluir", min_value=0, value=0, step=500)
+        exportacion_bajo_demanda(
+            "Excel", (resumen_excel, int(movimientos_excel)),
+            lambda: excel_temporal(inv.bd, incluir_resumen=resumen_excel, movimientos=int(movimientos_excel)),
+            "inventario.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
     with col3:
-        # PDF
-        try:
-            rows = df_prod.to_dict(orient='records')
-            pdf_bytes = df_to_pdf_bytes(rows)
-            st.download_button("📥 Descargar PDF", data=pdf_bytes, file_name="inventario.pdf", mime="application/pdf")
-        except Exception as e:
-            st.warning("Para exportar PDF instala fpdf2 (pip install fpdf2)")
+        modos_pdf = {"Detalle": ("detalle", "tipo_tela"), "Agrupado por tela": ("agrupado", "tipo_tela"),
+                     "Agrupado por talla": ("agrupado", "talla"), "Solo resumen": ("resumen", "tipo_tela")}
+        modo_pdf, agrupar_pdf = modos_pdf[st.selectbox("Informe PDF", list(modos_pdf))]
+        barra_pdf = st.empty()
+        exportacion_bajo_demanda(
+            "PDF", (modo_pdf, agrupar_pdf), lambda: exportacion_pdf(modo_pdf, agrupar_pdf, barra_pdf),
+            "inventario.pdf", "application/pdf"
+        )
 
 # -----------------------------------
 # Ajustes / About
@@ -378,15 +550,44 @@ elif menu == "Ajustes":
     st.markdown("""
     **Opciones**
     - Base de datos: SQLite (archivo en `datos/inventario.db`)
-    - Export: CSV / Excel (pandas+openpyxl) / PDF (fpdf2)
+    - Perfil de conexión: variable `INVENTARIO_PERFIL_BD` (`rendimiento`, `seguro`, `compatible`)
+    - Export: CSV / Excel (openpyxl) / PDF (fpdf2)
     - Gráficos: plotly (recomendado)
     """)
-    if st.button("Crear respaldo de la BD ahora"):
-        ok = inv.bd.crear_respaldo()
-        if ok:
-            st.success("Respaldo creado en carpeta datos/")
-        else:
-            st.error("No fue posible crear respaldo")
+    with st.expander("PRAGMA de conexión activos"):
+        st.json(inv.bd.pragmas)
+    with st.expander("Uso del pool de conexiones"):
+        st.json(inv.bd.metricas_pool())
+    with st.expander("Archivar historial antiguo"):
+        st.caption("Mueve los movimientos anteriores a la fecha elegida a un archivo aparte "
+                   "(una tabla por mes) y guarda acumulados por producto.")
+        corte = st.date_input("Archivar movimientos anteriores a", key="fecha_corte_archivo")
+        if st.button("Archivar movimientos"):
+            archivados = inv.bd.archivar_historial(corte)
+            if archivados is None:
+                st.error("No fue posible archivar el historial")
+            else:
+                st.success(f"{archivados} movimientos archivados")
+    with st.expander("Respaldo de la base de datos", expanded=True):
+        st.caption("El respaldo se copia por pasos en segundo plano; la app sigue disponible mientras tanto.")
+        comprimir = st.checkbox("Comprimir (.db.gz)", value=True)
+        conservar = st.number_input("Respaldos a conservar (0 = todos)", min_value=0, value=5, step=1)
+        paginas = st.number_input("Páginas por paso", min_value=16, value=256, step=16)
+        if st.button("Crear respaldo de la BD ahora"):
+            st.session_state["respaldo"] = inv.bd.respaldo_en_segundo_plano(
+                paginas_por_paso=int(paginas), comprimir=comprimir, conservar=int(conservar) or None
+            )
+
+        futuro = st.session_state.get("respaldo")
+        if futuro is not None:
+            if not futuro.done():
+                st.info("Respaldo en curso...")
+                if st.button("Actualizar estado"):
+                    st.rerun()
+            elif futuro.result():
+                st.success(f"Respaldo creado: {futuro.result()}")
+            else:
+                st.error("No fue posible crear respaldo")
 
 # -----------------------------------
 # Fin
@@ -3,17 +3,524 @@
 
 import sqlite3
 import os
-from producto import Producto
-from datetime import datetime
+import re
+import copy
+import queue
+import time
+import functools
+import threading
+import gzip
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from producto import Producto, CAMPOS_PRODUCTO
+from datetime import date, datetime, timedelta
+
+# Esquemas ya creados en este proceso (evita repetir los CREATE en cada rerun):
+# (ruta absoluta, usar_resumen) -> fts_disponible
+_esquemas_creados = {}
+_bloqueo_esquemas = threading.Lock()
+
+
+def _uri_solo_lectura(ruta):
+    """URI file: de solo lectura para ruta (escapa %, ? y # y sirve con rutas de Windows)"""
+    return Path(ruta).resolve().as_uri() + "?mode=ro"
+
+
+class PoolAgotado(sqlite3.OperationalError):
+    """No se obtuvo una conexión del pool dentro del tiempo de espera"""
+
+
+def _escritura(por_defecto=None):
+    """Ejecuta el método con la conexión de escritura del pool (un escritor a la vez)"""
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            try:
+                with self.pool.escritura():
+                    resultado = metodo(self, *args, **kwargs)
+                    self._podar_si_toca()
+                    return resultado
+            except PoolAgotado as e:
+                print(f" {metodo.__name__}: {e}")
+                return copy.deepcopy(por_defecto)
+        return envoltura
+    return decorador
+
+
+def _lectura(por_defecto=None):
+    """Ejecuta el método con una conexión de lectura prestada por el pool"""
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            try:
+                with self.pool.lectura():
+                    return metodo(self, *args, **kwargs)
+            except PoolAgotado as e:
+                self._errores_lectura += 1
+                print(f" {metodo.__name__}: {e}")
+                return copy.deepcopy(por_defecto)
+        return envoltura
+    return decorador
+
+
+class PoolConexiones:
+    """Pool con un número acotado de conexiones de lectura y una única conexión de escritura"""
+    
+    def __init__(self, abrir_escritura, abrir_lectura, max_lectores=4, timeout=10.0):
+        self._abrir_escritura = abrir_escritura
+        self._abrir_lectura = abrir_lectura
+        self.max_lectores = max_lectores
+        self.timeout = timeout
+        self.conexion_escritura = abrir_escritura()
+        self._bloqueo_escritura = threading.RLock()
+        # LIFO: se reutiliza primero la conexión con la caché de páginas más caliente
+        self._libres = queue.LifoQueue()
+        self._bloqueo = threading.Lock()
+        self._local = threading.local()
+        # Hilo -> conexión que tiene prestada para leer (para poder interrumpirla)
+        self._prestados = {}
+        self._creados = 0
+        self._en_uso = 0
+        self._cerrado = False
+        self._contadores = {
+            'prestamos_lectura': 0,
+            'prestamos_escritura': 0,
+            'esperas_lectura': 0,
+            'esperas_escritura': 0,
+            'segundos_espera_lectura': 0.0,
+            'segundos_espera_escritura': 0.0,
+            'tiempos_agotados': 0,
+            'max_lectores_en_uso': 0,
+        }
+    
+    def lector_actual(self):
+        """Conexión de lectura prestada al hilo actual (None si no tiene)"""
+        return getattr(self._local, 'lector', None)
+    
+    @contextmanager
+    def lectura(self):
+        """Presta una conexión de lectura; en el mismo hilo se reutiliza la ya prestada"""
+        actual = self.lector_actual()
+        if actual is not None:
+            yield actual
+            return
+        if self.max_lectores <= 0:
+            # Sin lectores propios (p. ej. ':memory:') se lee por la conexión de escritura
+            with self.escritura() as conexion:
+                self._anotar_lector(conexion)
+                try:
+                    yield conexion
+                finally:
+                    self._anotar_lector(None)
+            return
+        
+        conexion = self._prestar_lector()
+        self._anotar_lector(conexion)
+        try:
+            yield conexion
+        finally:
+            self._anotar_lector(None)
+            with self._bloqueo:
+                self._en_uso -= 1
+                cerrado = self._cerrado
+            if cerrado:
+                # El pool se cerró (o se reemplazó) mientras estaba prestada
+                conexion.close()
+            else:
+                self._libres.put(conexion)
+    
+    def _anotar_lector(self, conexion):
+        """Registra (o con None, olvida) la conexión de lectura prestada al hilo actual"""
+        self._local.lector = conexion
+        with self._bloqueo:
+            if conexion is None:
+                self._prestados.pop(threading.get_ident(), None)
+            else:
+                self._prestados[threading.get_ident()] = conexion
+    
+    def interrumpir_lectura(self, hilo):
+        """Interrumpe la consulta en curso del hilo (threading.get_ident) si está leyendo
+        
+        La consulta falla con sqlite3.OperationalError ("interrupted"). Si el hilo no tiene
+        una conexión de lectura prestada no se hace nada: nunca se interrumpe una escritura.
+        """
+        with self._bloqueo:
+            conexion = self._prestados.get(hilo)
+            if conexion is not None:
+                conexion.interrupt()
+            return conexion is not None
+    
+    def _prestar_lector(self):
+        """Toma una conexión libre, abre una nueva si hay cupo o espera hasta el timeout"""
+        try:
+            conexion = self._libres.get_nowait()
+        except queue.Empty:
+            with self._bloqueo:
+                crear = self._creados < self.max_lectores
+                if crear:
+                    self._creados += 1
+            if crear:
+                try:
+                    conexion = self._abrir_lectura()
+                except sqlite3.Error:
+                    with self._bloqueo:
+                        self._creados -= 1
+                    raise
+            else:
+                inicio = time.perf_counter()
+                try:
+                    conexion = self._libres.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._bloqueo:
+                        self._contadores['tiempos_agotados'] += 1
+                    raise PoolAgotado("no hay conexiones de lectura libres")
+                finally:
+                    with self._bloqueo:
+                        self._contadores['esperas_lectura'] += 1
+                        self._contadores['segundos_espera_lectura'] += time.perf_counter() - inicio
+        
+        with self._bloqueo:
+            self._en_uso += 1
+            self._contadores['prestamos_lectura'] += 1
+            self._contadores['max_lectores_en_uso'] = max(self._contadores['max_lectores_en_uso'], self._en_uso)
+        return conexion
+    
+    @contextmanager
+    def escritura(self):
+        """Presta la conexión de escritura en exclusiva (reentrante en el mismo hilo)"""
+        inicio = time.perf_counter()
+        if not self._bloqueo_escritura.acquire(timeout=self.timeout):
+            with self._bloqueo:
+                self._contadores['tiempos_agotados'] += 1
+            raise PoolAgotado("la conexión de escritura está ocupada")
+        espera = time.perf_counter() - inicio
+        with self._bloqueo:
+            self._contadores['prestamos_escritura'] += 1
+            if espera > 0.001:
+                self._contadores['esperas_escritura'] += 1
+                self._contadores['segundos_espera_escritura'] += espera
+        try:
+            yield self.conexion_escritura
+        finally:
+            self._bloqueo_escritura.release()
+    
+    def ceder_escritura(self, pausa=0.0):
+        """Suelta la conexión de escritura durante pausa segundos y la vuelve a tomar
+        
+        Solo debe llamarse desde dentro de escritura(); permite a otros hilos escribir
+        entre los pasos de una operación larga como un respaldo.
+        """
+        self._bloqueo_escritura.release()
+        try:
+            time.sleep(pausa)
+        finally:
+            self._bloqueo_escritura.acquire()
+    
+    def verificar(self):
+        """Comprueba las conexiones libres y reabre solo las que no respondan
+        
+        No espera a nadie: si la conexión de escritura está prestada, alguien la está
+        usando y no se comprueba; las de lectura en uso tampoco.
+        """
+        sanas = True
+        if self._bloqueo_escritura.acquire(blocking=False):
+            try:
+                self.conexion_escritura.execute("SELECT 1").fetchone()
+            except sqlite3.Error:
+                sanas = False
+                self._cerrar_en_silencio(self.conexion_escritura)
+                self.conexion_escritura = self._abrir_escritura()
+            finally:
+                self._bloqueo_escritura.release()
+        
+        libres = []
+        while True:
+            try:
+                libres.append(self._libres.get_nowait())
+            except queue.Empty:
+                break
+        for conexion in libres:
+            try:
+                conexion.execute("SELECT 1").fetchone()
+                self._libres.put(conexion)
+            except sqlite3.Error:
+                # Se descarta; el próximo préstamo abrirá una nueva
+                sanas = False
+                self._cerrar_en_silencio(conexion)
+                with self._bloqueo:
+                    self._creados -= 1
+        return sanas
+    
+    @staticmethod
+    def _cerrar_en_silencio(conexion):
+        """Cierra una conexión que se descarta (si ya estaba rota, close puede fallar)"""
+        try:
+            conexion.close()
+        except sqlite3.Error:
+            pass
+    
+    def metricas(self):
+        """Uso del pool: préstamos, esperas, tiempos agotados y ocupación de lectores"""
+        with self._bloqueo:
+            metricas = dict(self._contadores)
+            metricas.update({
+                'max_lectores': self.max_lectores,
+                'lectores_abiertos': self._creados,
+                'lectores_en_uso': self._en_uso,
+                'lectores_libres': self._libres.qsize(),
+                'utilizacion_lectores': self._en_uso / self.max_lectores if self.max_lectores else 0.0,
+            })
+            return metricas
+    
+    def cerrar(self):
+        """Cierra la conexión de escritura y las de lectura libres
+        
+        Las de lectura prestadas en ese momento se cierran al devolverse.
+        """
+        with self._bloqueo:
+            self._cerrado = True
+        with self.escritura():
+            while True:
+                try:
+                    self._libres.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._creados = 0
+            self.conexion_escritura.close()
+
+
+# Perfiles de conexión: valores de PRAGMA aplicados al abrir cada conexión
+PERFILES_CONEXION = {
+    # Lectores y escritor concurrentes, fsync solo en checkpoints
+    'rendimiento': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    # WAL con fsync en cada commit
+    'seguro': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16384,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 10000,
+    },
+    # Valores por defecto de SQLite (diario de reversión)
+    'compatible': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+    },
+}
+
+
+def cargar_perfil(perfil=None):
+    """Resuelve los PRAGMA de conexión
+    
+    perfil puede ser el nombre de un perfil o un dict de PRAGMA. Si no se indica se usa la
+    variable de entorno INVENTARIO_PERFIL_BD (por defecto 'rendimiento'). Cada PRAGMA puede
+    sobrescribirse con INVENTARIO_BD_<PRAGMA>, p. ej. INVENTARIO_BD_SYNCHRONOUS=FULL.
+    """
+    if isinstance(perfil, dict):
+        pragmas = dict(PERFILES_CONEXION['rendimiento'], **perfil)
+    else:
+        nombre = perfil or os.environ.get("INVENTARIO_PERFIL_BD", "rendimiento")
+        if nombre not in PERFILES_CONEXION:
+            print(f" Perfil de conexión desconocido '{nombre}', se usa 'rendimiento'")
+            nombre = 'rendimiento'
+        pragmas = dict(PERFILES_CONEXION[nombre])
+    
+    for pragma in list(pragmas):
+        valor = os.environ.get(f"INVENTARIO_BD_{pragma.upper()}")
+        if valor is not None:
+            pragmas[pragma] = valor
+    return pragmas
+
+
+def _cacheado(metodo):
+    """Sirve el resultado desde la caché de consultas mientras no haya escrituras
+
+    Antes de buscar en la caché se consulta version_datos (una búsqueda por clave), así
+    también se descartan los resultados viejos cuando escribió otra instancia o proceso.
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        self.version_datos()
+        generacion = self.cache.generacion
+        clave = (generacion, metodo.__name__, args, tuple(sorted(kwargs.items())))
+        encontrado, valor = self.cache.obtener(clave)
+        if encontrado:
+            return copy.copy(valor)
+        errores = self._errores_lectura
+        valor = metodo(self, *args, **kwargs)
+        # No se guardan resultados de consultas que fallaron
+        if self._errores_lectura == errores:
+            self.cache.guardar(clave, valor)
+        return copy.copy(valor)
+    return envoltura
+
+
+class CacheConsultas:
+    """Caché LRU de resultados de lectura, invalidada por número de generación"""
+    
+    def __init__(self, capacidad=128):
+        self.capacidad = capacidad
+        self.generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos = OrderedDict()
+        self._bloqueo = threading.Lock()
+    
+    def obtener(self, clave):
+        """Devuelve (encontrado, valor) y marca la entrada como usada recientemente"""
+        with self._bloqueo:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return True, self._datos[clave]
+            self.fallos += 1
+            return False, None
+    
+    def guardar(self, clave, valor):
+        """Guarda un resultado, descartando el menos usado si se supera la capacidad"""
+        if self.capacidad <= 0:
+            return
+        with self._bloqueo:
+            # Un resultado calculado antes de una escritura ya no es válido
+            if clave[0] != self.generacion:
+                return
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+    
+    def invalidar(self):
+        """Avanza la generación y descarta todos los resultados guardados"""
+        with self._bloqueo:
+            self.generacion += 1
+            self._datos.clear()
+    
+    def estadisticas(self):
+        """Métricas de uso de la caché"""
+        with self._bloqueo:
+            return {
+                'generacion': self.generacion,
+                'entradas': len(self._datos),
+                'capacidad': self.capacidad,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos
+            }
+
+
+# Columnas por las que se permite ordenar listados
+COLUMNAS_ORDEN = ['id', 'nombre', 'tipo_tela', 'talla', 'cantidad']
+
+# Columnas de productos en el orden de los campos de Producto
+COLUMNAS_PRODUCTO = ", ".join(CAMPOS_PRODUCTO)
+COLUMNAS_PRODUCTO_P = ", ".join(f"p.{campo}" for campo in CAMPOS_PRODUCTO)
+
+
+def _leer_productos(cursor):
+    """Convierte las filas del cursor (columnas COLUMNAS_PRODUCTO) en Producto
+    
+    Las filas se leen como tuplas simples, sin sqlite3.Row ni acceso por nombre.
+    """
+    cursor.row_factory = None
+    return list(map(Producto._make, cursor.fetchall()))
+
+
+# dtype de las columnas en los DataFrame de productos e historial
+TIPOS_PRODUCTO = {'id': 'int64', 'nombre': object, 'tipo_tela': object, 'talla': object,
+                  'cantidad': 'int64', 'color': object}
+TIPOS_HISTORIAL = {'id': 'int64', 'producto_id': 'int64', 'nombre': object, 'tipo_movimiento': object,
+                   'cantidad': 'int64', 'cantidad_anterior': 'Int64', 'cantidad_nueva': 'Int64',
+                   'fecha': 'datetime'}
+
+
+def _pandas():
+    """Importa pandas solo cuando se pide un DataFrame"""
+    try:
+        import pandas
+    except ImportError:
+        raise RuntimeError("Instala pandas para obtener DataFrames (pip install pandas)")
+    return pandas
+
+
+def _aplicar_tipos(df, tipos):
+    """Convierte las columnas del DataFrame a su dtype ('datetime' parsea el texto de SQLite)"""
+    pd = _pandas()
+    for columna, tipo in tipos.items():
+        if columna not in df:
+            continue
+        if tipo == 'datetime':
+            df[columna] = pd.to_datetime(df[columna], errors='coerce')
+        else:
+            df[columna] = df[columna].astype(tipo)
+    return df
+
+
+# Versión del esquema registrada en PRAGMA user_version
+VERSION_ESQUEMA = 1
+
+# Entradas de registro_cambios que se conservan al podar (los clientes más atrasados recargan todo)
+CAMBIOS_CONSERVADOS = 100000
+
+# Filas escritas (incluidas las de los triggers) entre una poda automática y la siguiente
+PODAR_CAMBIOS_CADA = 10000
+
+
+def normalizar_tela(tipo_tela):
+    """Forma en que se guarda y se busca el tipo de tela (minúsculas)"""
+    return str(tipo_tela).strip().lower()
+
+
+def normalizar_talla(talla):
+    """Forma en que se guarda y se busca la talla (mayúsculas)"""
+    return str(talla).strip().upper()
+
 
 class BaseDatos:
-    def __init__(self, ruta_db="datos/inventario.db"):
+    def __init__(self, ruta_db="datos/inventario.db", tamano_cache=128, usar_resumen=True, perfil=None,
+                 max_lectores=4, timeout_pool=10.0):
         """Inicializa la conexión a la base de datos"""
         self.ruta_db = ruta_db
+        # Movimientos archivados: un archivo aparte con una tabla por mes (en memoria si la base lo está)
+        self.ruta_archivo = ":memory:" if ruta_db == ":memory:" else os.path.splitext(ruta_db)[0] + "_archivo.db"
+        self.usar_resumen = usar_resumen
+        self.fts_disponible = True
+        self.pragmas = cargar_perfil(perfil)
+        self.max_lectores = max_lectores
+        self.timeout_pool = timeout_pool
+        self.cache = CacheConsultas(tamano_cache)
+        self._errores_lectura = 0
+        self._version_vista = None
+        self._ejecutor_respaldo = None
+        self._bloqueo_respaldo = threading.Lock()
         self._crear_directorio()
-        self.conexion = None
+        self.pool = None
         self.conectar()
-        self._crear_tablas()
+        self._inicializar_esquema()
+        self._cambios_podados = self.conexion.total_changes
+    
+    @property
+    def conexion(self):
+        """Conexión de escritura del pool"""
+        return self.pool.conexion_escritura
+    
+    @property
+    def conexion_lectura(self):
+        """Conexión de lectura prestada al hilo actual (la de escritura fuera de un préstamo)"""
+        return self.pool.lector_actual() or self.pool.conexion_escritura
     
     def _crear_directorio(self):
         """Crea el directorio de datos si no existe"""
@@ -25,12 +532,88 @@ class BaseDatos:
     def conectar(self):
         """Establece conexión con la base de datos"""
         try:
-            self.conexion = sqlite3.connect(self.ruta_db)
-            self.conexion.row_factory = sqlite3.Row
+            # Una base en memoria no se puede abrir desde otra conexión: se lee por la de escritura
+            max_lectores = 0 if self.ruta_db == ":memory:" else self.max_lectores
+            anterior = self.pool
+            self.pool = PoolConexiones(self._conectar_escritura, self._conectar_lectura,
+                                       max_lectores, self.timeout_pool)
             print(f" Conectado a la base de datos: {self.ruta_db}")
         except sqlite3.Error as e:
             print(f" Error al conectar a la base de datos: {e}")
             raise
+        if anterior is not None:
+            # Sin esto quedarían abiertos sus archivos y sus lectores del WAL
+            try:
+                anterior.cerrar()
+            except sqlite3.Error as e:
+                print(f" No se pudo cerrar la conexión anterior: {e}")
+    
+    def _conectar_escritura(self):
+        """Abre la conexión de escritura"""
+        # check_same_thread=False: el pool la presta a distintos hilos, de a uno por vez
+        conexion = sqlite3.connect(self.ruta_db, check_same_thread=False)
+        conexion.row_factory = sqlite3.Row
+        self._aplicar_pragmas(conexion, escritura=True)
+        return conexion
+    
+    def _conectar_lectura(self):
+        """Abre una conexión de solo lectura para el pool"""
+        conexion = sqlite3.connect(_uri_solo_lectura(self.ruta_db), uri=True, check_same_thread=False)
+        conexion.row_factory = sqlite3.Row
+        self._aplicar_pragmas(conexion, escritura=False)
+        return conexion
+    
+    def _aplicar_pragmas(self, conexion, escritura):
+        """Aplica los PRAGMA del perfil (journal_mode solo se fija desde la conexión de escritura)"""
+        for pragma, valor in self.pragmas.items():
+            if pragma == 'journal_mode' and not escritura:
+                continue
+            try:
+                conexion.execute(f"PRAGMA {pragma} = {valor}").fetchall()
+            except sqlite3.Error as e:
+                print(f" No se pudo aplicar PRAGMA {pragma}: {e}")
+    
+    def verificar_conexion(self):
+        """Comprueba que las conexiones sigan vivas y reconecta solo las que estén caídas"""
+        try:
+            if self.pool.verificar():
+                return True
+            print(" Conexión no disponible, se reabrió")
+            return False
+        except PoolAgotado as e:
+            # Conexiones ocupadas no son conexiones caídas: nunca se reemplaza el pool por esto
+            print(f" {e}")
+            return True
+        except sqlite3.Error as e:
+            print(f" Conexión no disponible ({e}), reconectando...")
+            self.conectar()
+            return False
+    
+    def metricas_pool(self):
+        """Métricas de uso del pool de conexiones"""
+        return self.pool.metricas()
+    
+    def invalidar_cache(self):
+        """Descarta los resultados en caché (p. ej. tras cambios hechos por otro proceso)"""
+        self.cache.invalidar()
+    
+    def _inicializar_esquema(self):
+        """Crea las tablas una sola vez por proceso para cada archivo y configuración
+        
+        Una base en memoria es nueva en cada instancia: su esquema se crea siempre.
+        """
+        if self.ruta_db == ":memory:":
+            with self.pool.escritura():
+                self._crear_tablas()
+            return
+        clave = (os.path.abspath(self.ruta_db), self.usar_resumen)
+        with _bloqueo_esquemas:
+            if clave in _esquemas_creados:
+                self.fts_disponible = _esquemas_creados[clave]
+                return
+            with self.pool.escritura():
+                self._crear_tablas()
+            _esquemas_creados[clave] = self.fts_disponible
     
     def _crear_tablas(self):
         """Crea las tablas necesarias si no existen"""
@@ -65,14 +648,233 @@ class BaseDatos:
             )
         """)
         
+        # Acumulado por producto de los movimientos ya archivados
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS historial_rollup (
+                producto_id INTEGER PRIMARY KEY,
+                movimientos INTEGER NOT NULL DEFAULT 0,
+                suma_cantidad INTEGER NOT NULL DEFAULT 0,
+                primera_fecha TIMESTAMP,
+                ultima_fecha TIMESTAMP,
+                cantidad_al_corte INTEGER
+            )
+        """)
+        
         # Índices para optimizar búsquedas
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_tipo_tela ON productos(tipo_tela)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_talla ON productos(talla)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_tela_talla ON productos(tipo_tela, talla)")
+        # Índices para paginar ordenando por nombre o por stock (el id va implícito en el índice)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_nombre ON productos(nombre)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cantidad ON productos(cantidad)")
+        # Historial: recorrido por fecha (global, por producto o por tipo) sin ordenar la tabla completa
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_hist_fecha ON historial_movimientos(fecha, id)")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_hist_producto_fecha
+            ON historial_movimientos(producto_id, fecha, id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_hist_tipo_fecha
+            ON historial_movimientos(tipo_movimiento, fecha, id)
+        """)
+        
+        self._migrar(cursor)
+        
+        if self.usar_resumen:
+            self._crear_resumen(cursor)
+        
+        self.fts_disponible = self._crear_fts(cursor)
+        
+        self._crear_registro_cambios(cursor)
         
         self.conexion.commit()
         print(" Tablas e índices creados correctamente")
     
+    def _migrar(self, cursor):
+        """Aplica las migraciones pendientes según PRAGMA user_version"""
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+        
+        if version < 1:
+            # Normaliza tela/talla de filas antiguas para que las búsquedas por igualdad usen los índices
+            for columna, normalizar in (('tipo_tela', normalizar_tela), ('talla', normalizar_talla)):
+                cursor.execute(f"SELECT DISTINCT {columna} FROM productos")
+                for (valor,) in cursor.fetchall():
+                    if valor != normalizar(valor):
+                        cursor.execute(f"UPDATE productos SET {columna} = ? WHERE {columna} = ?",
+                                       (normalizar(valor), valor))
+        
+        if version < VERSION_ESQUEMA:
+            cursor.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+    
+    def _crear_resumen(self, cursor):
+        """Crea la tabla resumen_inventario y los triggers que la mantienen al día"""
+        cursor.execute("""
+            SELECT COUNT(*) FROM sqlite_master
+            WHERE type = 'trigger' AND name LIKE 'trg_resumen_%'
+        """)
+        triggers_existentes = cursor.fetchone()[0]
+        
+        # Contadores por tela y por talla: una fila por grupo
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS resumen_inventario (
+                dimension TEXT NOT NULL,
+                valor TEXT NOT NULL,
+                productos INTEGER NOT NULL DEFAULT 0,
+                unidades INTEGER NOT NULL DEFAULT 0,
+                sin_stock INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, valor)
+            ) WITHOUT ROWID
+        """)
+        
+        sumar = """
+            INSERT INTO resumen_inventario (dimension, valor, productos, unidades, sin_stock)
+            VALUES ('{dim}', NEW.{col}, 1, NEW.cantidad, NEW.cantidad = 0)
+            ON CONFLICT (dimension, valor) DO UPDATE SET
+                productos = productos + 1,
+                unidades = unidades + excluded.unidades,
+                sin_stock = sin_stock + excluded.sin_stock;
+        """
+        restar = """
+            UPDATE resumen_inventario
+            SET productos = productos - 1,
+                unidades = unidades - OLD.cantidad,
+                sin_stock = sin_stock - (OLD.cantidad = 0)
+            WHERE dimension = '{dim}' AND valor = OLD.{col};
+            DELETE FROM resumen_inventario
+            WHERE dimension = '{dim}' AND valor = OLD.{col} AND productos <= 0;
+        """
+        alta = "".join(sumar.format(dim=d, col=c) for d, c in (('tela', 'tipo_tela'), ('talla', 'talla')))
+        baja = "".join(restar.format(dim=d, col=c) for d, c in (('tela', 'tipo_tela'), ('talla', 'talla')))
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_insert
+            AFTER INSERT ON productos
+            BEGIN {alta} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_delete
+            AFTER DELETE ON productos
+            BEGIN {baja} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_update
+            AFTER UPDATE OF tipo_tela, talla, cantidad ON productos
+            BEGIN {baja} {alta} END
+        """)
+        
+        # Si los triggers no existían, la tabla puede estar desfasada respecto a productos
+        if triggers_existentes < 3:
+            self._reconstruir_resumen(cursor)
+    
+    def _crear_fts(self, cursor):
+        """Crea el índice de texto completo productos_fts (FTS5) y sus triggers de sincronización"""
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'productos_fts'")
+        existia = cursor.fetchone()[0] > 0
+        try:
+            # Tabla de contenido externo: solo guarda el índice, los textos siguen en productos
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+                    nombre, color, tipo_tela,
+                    content='productos', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            """)
+        except sqlite3.Error as e:
+            print(f" Búsqueda de texto sin FTS5 ({e}); se usará LIKE")
+            return False
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON productos BEGIN
+                INSERT INTO productos_fts (rowid, nombre, color, tipo_tela)
+                VALUES (NEW.id, NEW.nombre, NEW.color, NEW.tipo_tela);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON productos BEGIN
+                INSERT INTO productos_fts (productos_fts, rowid, nombre, color, tipo_tela)
+                VALUES ('delete', OLD.id, OLD.nombre, OLD.color, OLD.tipo_tela);
+            END
+        """)
+        # Solo cambios de texto: los movimientos de stock no tocan el índice
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF nombre, color, tipo_tela ON productos BEGIN
+                INSERT INTO productos_fts (productos_fts, rowid, nombre, color, tipo_tela)
+                VALUES ('delete', OLD.id, OLD.nombre, OLD.color, OLD.tipo_tela);
+                INSERT INTO productos_fts (rowid, nombre, color, tipo_tela)
+                VALUES (NEW.id, NEW.nombre, NEW.color, NEW.tipo_tela);
+            END
+        """)
+        
+        if not existia:
+            cursor.execute("INSERT INTO productos_fts (productos_fts) VALUES ('rebuild')")
+        return True
+    
+    def _crear_registro_cambios(self, cursor):
+        """Crea registro_cambios y los triggers que anotan cada cambio en productos e historial
+        
+        Cada fila insertada, modificada o borrada deja una entrada cuyo número (version) crece
+        siempre, también con escrituras de otros procesos sobre el mismo archivo. La versión
+        de los datos es la última entrada y cambios_desde(version) devuelve lo ocurrido después.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS registro_cambios (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabla TEXT NOT NULL,
+                fila_id INTEGER NOT NULL
+            )
+        """)
+        for tabla, origen, eventos in (('productos', 'productos', ('INSERT', 'UPDATE', 'DELETE')),
+                                       ('historial', 'historial_movimientos', ('INSERT', 'DELETE'))):
+            for evento in eventos:
+                fila = "OLD.id" if evento == 'DELETE' else "NEW.id"
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla}_{evento.lower()}
+                    AFTER {evento} ON {origen} BEGIN
+                        INSERT INTO registro_cambios (tabla, fila_id) VALUES ('{tabla}', {fila});
+                    END
+                """)
+        self._podar_cambios(cursor, CAMBIOS_CONSERVADOS)
+    
+    @staticmethod
+    def _podar_cambios(cursor, conservar):
+        """Borra las entradas de registro_cambios salvo las últimas conservar (al menos una)"""
+        cursor.execute("""
+            DELETE FROM registro_cambios
+            WHERE version <= (SELECT MAX(version) FROM registro_cambios) - MAX(?, 1)
+        """, (conservar,))
+        return cursor.rowcount
+    
+    def _reconstruir_resumen(self, cursor):
+        """Recalcula resumen_inventario completo a partir de productos"""
+        cursor.execute("DELETE FROM resumen_inventario")
+        for dimension, columna in (('tela', 'tipo_tela'), ('talla', 'talla')):
+            cursor.execute(f"""
+                INSERT INTO resumen_inventario (dimension, valor, productos, unidades, sin_stock)
+                SELECT '{dimension}', {columna}, COUNT(*), COALESCE(SUM(cantidad), 0),
+                       SUM(cantidad = 0)
+                FROM productos
+                GROUP BY {columna}
+            """)
+    
+    @_escritura(False)
+    def reconstruir_resumen(self):
+        """Reconstruye la tabla de resumen (p. ej. tras cargas hechas sin triggers)"""
+        if not self.usar_resumen:
+            return False
+        try:
+            self._reconstruir_resumen(self.conexion.cursor())
+            self.conexion.commit()
+            self.cache.invalidar()
+            print(" Resumen de inventario reconstruido")
+            return True
+        except sqlite3.Error as e:
+            print(f" Error al reconstruir resumen: {e}")
+            self.conexion.rollback()
+            return False
+    
+    @_escritura(None)
     def agregar_producto(self, nombre, tipo_tela, talla, cantidad, color="N/A"):
         """Agrega un nuevo producto a la base de datos"""
         try:
@@ -80,7 +882,7 @@ class BaseDatos:
             cursor.execute("""
                 INSERT INTO productos (nombre, tipo_tela, talla, cantidad, color)
                 VALUES (?, ?, ?, ?, ?)
-            """, (nombre, tipo_tela.lower(), talla.upper(), cantidad, color))
+            """, (nombre, normalizar_tela(tipo_tela), normalizar_talla(talla), cantidad, color))
             
             producto_id = cursor.lastrowid
             
@@ -91,6 +893,7 @@ class BaseDatos:
             """, (producto_id, cantidad, cantidad))
             
             self.conexion.commit()
+            self.cache.invalidar()
             print(f" Producto agregado con ID: {producto_id}")
             return producto_id
         except sqlite3.Error as e:
@@ -98,124 +901,401 @@ class BaseDatos:
             self.conexion.rollback()
             return None
     
+    @_escritura(None)
+    def insertar_productos_lote(self, filas):
+        """Inserta un lote de (nombre, tipo_tela, talla, cantidad, color) con su alta en historial"""
+        try:
+            cursor = self.conexion.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # Con AUTOINCREMENT los nuevos IDs siempre superan al máximo actual
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM productos")
+            ultimo_id = cursor.fetchone()[0]
+            
+            cursor.executemany("""
+                INSERT INTO productos (nombre, tipo_tela, talla, cantidad, color)
+                VALUES (?, ?, ?, ?, ?)
+            """, filas)
+            
+            cursor.execute("""
+                INSERT INTO historial_movimientos 
+                (producto_id, tipo_movimiento, cantidad, cantidad_nueva)
+                SELECT id, 'ALTA', cantidad, cantidad FROM productos WHERE id > ?
+            """, (ultimo_id,))
+            
+            self.conexion.commit()
+            self.cache.invalidar()
+            return len(filas)
+        except sqlite3.Error as e:
+            print(f" Error al insertar lote de productos: {e}")
+            self.conexion.rollback()
+            return None
+    
+    @_cacheado
+    @_lectura([])
     def obtener_todos(self, ordenar_por="id"):
         """Obtiene todos los productos ordenados"""
         try:
-            cursor = self.conexion.cursor()
-            orden_valido = ordenar_por if ordenar_por in ['id', 'nombre', 'tipo_tela', 'talla', 'cantidad'] else 'id'
+            cursor = self.conexion_lectura.cursor()
+            orden_valido = ordenar_por if ordenar_por in COLUMNAS_ORDEN else 'id'
             
-            cursor.execute(f"SELECT * FROM productos ORDER BY {orden_valido}")
+            cursor.execute(f"SELECT {COLUMNAS_PRODUCTO} FROM productos ORDER BY {orden_valido}")
             
-            productos = []
-            for fila in cursor.fetchall():
-                productos.append(Producto(
-                    fila['id'], fila['nombre'], fila['tipo_tela'],
-                    fila['talla'], fila['cantidad'], fila['color']
-                ))
-            return productos
+            return _leer_productos(cursor)
         except sqlite3.Error as e:
+            self._errores_lectura += 1
             print(f" Error al obtener productos: {e}")
             return []
     
-    def buscar_por_id(self, producto_id):
-        """Busca un producto por su ID"""
+    @_cacheado
+    @_lectura([])
+    def obtener_pagina(self, ordenar_por="id", limite=50, despues=None, desplazamiento=0, descendente=False):
+        """Obtiene una página de productos ordenada por (ordenar_por, id)
+        
+        despues es la clave (valor, id) de la última fila de la página anterior y permite
+        avanzar por índice sin recorrer las filas previas; desplazamiento salta N filas
+        (útil para ir directo a una página).
+        """
         try:
-            cursor = self.conexion.cursor()
-            cursor.execute("SELECT * FROM productos WHERE id = ?", (producto_id,))
-            fila = cursor.fetchone()
+            cursor = self.conexion_lectura.cursor()
+            orden_valido = ordenar_por if ordenar_por in COLUMNAS_ORDEN else 'id'
+            sentido = "DESC" if descendente else "ASC"
+            
+            query = f"SELECT {COLUMNAS_PRODUCTO} FROM productos"
+            parametros = []
+            if despues is not None:
+                comparador = "<" if descendente else ">"
+                if orden_valido == 'id':
+                    query += f" WHERE id {comparador} ?"
+                    parametros.append(despues[-1])
+                else:
+                    query += f" WHERE ({orden_valido}, id) {comparador} (?, ?)"
+                    parametros.extend(despues)
+            
+            if orden_valido == 'id':
+                query += f" ORDER BY id {sentido} LIMIT ? OFFSET ?"
+            else:
+                query += f" ORDER BY {orden_valido} {sentido}, id {sentido} LIMIT ? OFFSET ?"
+            parametros.extend([limite, desplazamiento])
+            cursor.execute(query, parametros)
+            
+            return _leer_productos(cursor)
+        except sqlite3.Error as e:
+            self._errores_lectura += 1
+            print(f" Error al obtener página de productos: {e}")
+            return []
+    
+    @staticmethod
+    def clave_pagina(producto, ordenar_por="id"):
+        """Clave (valor, id) de un producto para pedir la página siguiente"""
+        columna = ordenar_por if ordenar_por in COLUMNAS_ORDEN else 'id'
+        return (getattr(producto, columna), producto.id)
+    
+    def iterar_productos(self, ordenar_por="id", tamano_bloque=2000,
+                         columnas=("id", "nombre", "tipo_tela", "talla", "color", "cantidad")):
+        """Genera los productos por bloques de tuplas, sin cargar la tabla completa
+        
+        Cada bloque es una lista de hasta tamano_bloque tuplas con las columnas pedidas. Se
+        avanza por clave (ordenar_por, id) y la conexión de lectura se devuelve al pool entre
+        bloques, así una exportación larga no la retiene mientras el consumidor escribe.
+        Un error de SQLite (incluido PoolAgotado) se propaga al consumidor.
+        """
+        orden_valido = ordenar_por if ordenar_por in COLUMNAS_ORDEN else 'id'
+        seleccion = [c for c in columnas if c in COLUMNAS_ORDEN or c == 'color']
+        # Columnas auxiliares para la clave, al final de cada tupla y recortadas al entregarla
+        consulta = f"SELECT {', '.join(seleccion)}, {orden_valido}, id FROM productos"
+        if orden_valido == 'id':
+            orden, filtro = " ORDER BY id", " WHERE id > ?"
+        else:
+            orden, filtro = f" ORDER BY {orden_valido}, id", f" WHERE ({orden_valido}, id) > (?, ?)"
+        
+        despues = None
+        while True:
+            try:
+                with self.pool.lectura() as conexion:
+                    cursor = conexion.cursor()
+                    cursor.row_factory = None
+                    if despues is None:
+                        cursor.execute(consulta + orden + " LIMIT ?", (tamano_bloque,))
+                    else:
+                        parametros = despues[-1:] if orden_valido == 'id' else despues
+                        cursor.execute(consulta + filtro + orden + " LIMIT ?", (*parametros, tamano_bloque))
+                    filas = cursor.fetchall()
+            except sqlite3.Error as e:
+                # Terminar en silencio dejaría la exportación incompleta como si fuera válida
+                self._errores_lectura += 1
+                print(f" Error al recorrer productos: {e}")
+                raise
+            if not filas:
+                return
+            despues = filas[-1][-2:]
+            yield [fila[:-2] for fila in filas]
+            if len(filas) < tamano_bloque:
+                return
+    
+    def _observar_version(self, version):
+        """Invalida la caché si la versión de los datos avanzó (p. ej. por otro proceso)"""
+        if self._version_vista is not None and version != self._version_vista:
+            self.cache.invalidar()
+        self._version_vista = version
+    
+    @_lectura(0)
+    def version_datos(self):
+        """Versión actual de los datos: crece con cada cambio en productos o historial
+        
+        Es barata (una búsqueda por la clave de registro_cambios), así que sirve para
+        sondear seguido y releer solo cuando cambió. Si otro proceso escribió, descarta
+        la caché de consultas de esta instancia.
+        """
+        try:
+            cursor = self.conexion_lectura.cursor()
+            cursor.row_factory = None
+            version = cursor.execute("SELECT COALESCE(MAX(version), 0) FROM registro_cambios").fetchone()[0]
+            self._observar_version(version)
+            return version
+        except sqlite3.Error as e:
+            self._errores_lectura += 1
+            print(f" Error al obtener la versión de los datos: {e}")
+            return 0
+    
+    @_lectura(None)
+    def cambios_desde(self, version=None, limite=1000):
+        """Cambios en productos e historial posteriores a version
+        
+        Devuelve un diccionario con 'version' (la actual, para la próxima consulta),
+        'productos' (filas actuales de los productos creados o modificados),
+        'productos_eliminados' y 'movimientos_eliminados' (ids) y 'movimientos' (nuevos,
+        con el formato de obtener_historial). Con 'completo' en True no se informan
+        cambios y el cliente debe recargar todo: pasa si version es None, si las entradas
+        necesarias ya se podaron o si hay más de limite entradas pendientes.
+        """
+        try:
+            cursor = self.conexion_lectura.cursor()
+            cursor.row_factory = None
+            actual, primera = cursor.execute(
+                "SELECT COALESCE(MAX(version), 0), MIN(version) FROM registro_cambios"
+            ).fetchone()
+            self._observar_version(actual)
+            cambios = {'version': actual, 'completo': False, 'productos': [], 'productos_eliminados': [],
+                       'movimientos': [], 'movimientos_eliminados': []}
+            if version == actual:
+                return cambios
+            if version is None or version > actual or (primera is not None and version < primera - 1):
+                cambios['completo'] = True
+                return cambios
+            
+            pendientes = cursor.execute("""
+                SELECT COUNT(*) FROM (SELECT 1 FROM registro_cambios WHERE version > ? LIMIT ?)
+            """, (version, limite + 1)).fetchone()[0]
+            if pendientes > limite:
+                cambios['completo'] = True
+                return cambios
+            
+            # Solo hasta actual: lo posterior se informará en la próxima consulta
+            cursor.execute("""
+                SELECT DISTINCT tabla, fila_id FROM registro_cambios
+                WHERE version > ? AND version <= ?
+            """, (version, actual))
+            tocados = {'productos': set(), 'historial': set()}
+            for tabla, fila_id in cursor.fetchall():
+                tocados[tabla].add(fila_id)
             
-            if fila:
-                return Producto(fila['id'], fila['nombre'], fila['tipo_tela'],
-                              fila['talla'], fila['cantidad'], fila['color'])
+            rango = (version, actual)
+            if tocados['productos']:
+                cursor.execute(f"""
+                    SELECT {COLUMNAS_PRODUCTO} FROM productos
+                    WHERE id IN (SELECT fila_id FROM registro_cambios
+                                 WHERE version > ? AND version <= ? AND tabla = 'productos')
+                    ORDER BY id
+                """, rango)
+                cambios['productos'] = _leer_productos(cursor)
+                vigentes = {p.id for p in cambios['productos']}
+                cambios['productos_eliminados'] = sorted(tocados['productos'] - vigentes)
+            
+            if tocados['historial']:
+                cursor = self.conexion_lectura.cursor()
+                cursor.execute("""
+                    SELECT h.id, h.producto_id, p.nombre, h.tipo_movimiento, h.cantidad,
+                           h.cantidad_anterior, h.cantidad_nueva, h.fecha
+                    FROM historial_movimientos h
+                    JOIN productos p ON h.producto_id = p.id
+                    WHERE h.id IN (SELECT fila_id FROM registro_cambios
+                                   WHERE version > ? AND version <= ? AND tabla = 'historial')
+                    ORDER BY h.fecha DESC, h.id DESC
+                """, rango)
+                cambios['movimientos'] = [dict(fila) for fila in cursor.fetchall()]
+                vigentes = {mov['id'] for mov in cambios['movimientos']}
+                cambios['movimientos_eliminados'] = sorted(tocados['historial'] - vigentes)
+            return cambios
+        except sqlite3.Error as e:
+            self._errores_lectura += 1
+            print(f" Error al obtener cambios: {e}")
             return None
+    
+    def _podar_si_toca(self):
+        """(Con la conexión de escritura) Poda registro_cambios cada PODAR_CAMBIOS_CADA filas escritas
+        
+        Se usa total_changes de la conexión, así no cuesta ninguna consulta por escritura.
+        """
+        conexion = self.conexion
+        if conexion.in_transaction:
+            return
+        escritas = conexion.total_changes - self._cambios_podados
+        # Negativo: el pool se reabrió y la conexión nueva empezó a contar de cero
+        if 0 <= escritas < PODAR_CAMBIOS_CADA:
+            return
+        try:
+            self._podar_cambios(conexion.cursor(), CAMBIOS_CONSERVADOS)
+            conexion.commit()
+        except sqlite3.Error as e:
+            print(f" Error al podar el registro de cambios: {e}")
+            conexion.rollback()
+        self._cambios_podados = conexion.total_changes
+    
+    @_escritura(0)
+    def podar_cambios(self, conservar=CAMBIOS_CONSERVADOS):
+        """Recorta registro_cambios a sus últimas conservar entradas; devuelve cuántas borró"""
+        try:
+            borradas = self._podar_cambios(self.conexion.cursor(), conservar)
+            self.conexion.commit()
+            return borradas
+        except sqlite3.Error as e:
+            print(f" Error al podar el registro de cambios: {e}")
+            self.conexion.rollback()
+            return 0
+    
+    @_cacheado
+    @_lectura(0)
+    def contar_productos(self):
+        """Cuenta los productos registrados"""
+        try:
+            cursor = self.conexion_lectura.cursor()
+            cursor.execute("SELECT COUNT(*) as total FROM productos")
+            return cursor.fetchone()['total']
+        except sqlite3.Error as e:
+            self._errores_lectura += 1
+            print(f" Error al contar productos: {e}")
+            return 0
+    
+    @_lectura(None)
+    def buscar_por_id(self, producto_id):
+        """Busca un producto por su ID"""
+        try:
+            cursor = self.conexion_lectura.cursor()
+            cursor.execute(f"SELECT {COLUMNAS_PRODUCTO} FROM productos WHERE id = ?", (producto_id,))
+            productos = _leer_productos(cursor)
+            return productos[0] if productos else None
         except sqlite3.Error as e:
             print(f" Error al buscar producto: {e}")
             return None
     
+    @_lectura([])
     def buscar_por_tela(self, tipo_tela):
         """Busca productos por tipo de tela (ignora color)"""
         try:
-            cursor = self.conexion.cursor()
-            cursor.execute("""
-                SELECT * FROM productos 
-                WHERE LOWER(tipo_tela) = LOWER(?)
+            cursor = self.conexion_lectura.cursor()
+            cursor.execute(f"""
+                SELECT {COLUMNAS_PRODUCTO} FROM productos 
+                WHERE tipo_tela = ?
                 ORDER BY talla, nombre
-            """, (tipo_tela,))
-            
-            productos = []
-            for fila in cursor.fetchall():
-                productos.append(Producto(
-                    fila['id'], fila['nombre'], fila['tipo_tela'],
-                    fila['talla'], fila['cantidad'], fila['color']
-                ))
-            return productos
+            """, (normalizar_tela(tipo_tela),))
+            
+            return _leer_productos(cursor)
         except sqlite3.Error as e:
             print(f" Error en búsqueda por tela: {e}")
             return []
     
+    @_lectura([])
     def buscar_por_talla(self, talla):
         """Busca productos por talla (ignora color)"""
         try:
-            cursor = self.conexion.cursor()
-            cursor.execute("""
-                SELECT * FROM productos 
-                WHERE UPPER(talla) = UPPER(?)
+            cursor = self.conexion_lectura.cursor()
+            cursor.execute(f"""
+                SELECT {COLUMNAS_PRODUCTO} FROM productos 
+                WHERE talla = ?
                 ORDER BY tipo_tela, nombre
-            """, (talla,))
-            
-            productos = []
-            for fila in cursor.fetchall():
-                productos.append(Producto(
-                    fila['id'], fila['nombre'], fila['tipo_tela'],
-                    fila['talla'], fila['cantidad'], fila['color']
-                ))
-            return productos
+            """, (normalizar_talla(talla),))
+            
+            return _leer_productos(cursor)
         except sqlite3.Error as e:
             print(f" Error en búsqueda por talla: {e}")
             return []
     
+    @_lectura([])
     def buscar_combinado(self, tipo_tela=None, talla=None, stock_minimo=None):
         """Búsqueda con múltiples filtros"""
         try:
-            cursor = self.conexion.cursor()
-            query = "SELECT * FROM productos WHERE 1=1"
-            parametros = []
+            cursor = self.conexion_lectura.cursor()
+            where, parametros = self._filtros_productos(tipo_tela, talla, stock_minimo)
+            cursor.execute(f"SELECT {COLUMNAS_PRODUCTO} FROM productos {where} ORDER BY nombre", parametros)
             
-            if tipo_tela:
-                query += " AND LOWER(tipo_tela) = LOWER(?)"
-                parametros.append(tipo_tela)
-            
-            if talla:
-                query += " AND UPPER(talla) = UPPER(?)"
-                parametros.append(talla)
-            
-            if stock_minimo is not None:
-                query += " AND cantidad >= ?"
-                parametros.append(stock_minimo)
-            
-            query += " ORDER BY nombre"
-            cursor.execute(query, parametros)
-            
-            productos = []
-            for fila in cursor.fetchall():
-                productos.append(Producto(
-                    fila['id'], fila['nombre'], fila['tipo_tela'],
-                    fila['talla'], fila['cantidad'], fila['color']
-                ))
-            return productos
+            return _leer_productos(cursor)
         except sqlite3.Error as e:
             print(f" Error en búsqueda combinada: {e}")
             return []
     
+    @staticmethod
+    def _filtros_productos(tipo_tela=None, talla=None, stock_minimo=None):
+        """Arma el WHERE (y sus parámetros) de la búsqueda combinada"""
+        condiciones = []
+        parametros = []
+        if tipo_tela:
+            condiciones.append("tipo_tela = ?")
+            parametros.append(normalizar_tela(tipo_tela))
+        if talla:
+            condiciones.append("talla = ?")
+            parametros.append(normalizar_talla(talla))
+        if stock_minimo is not None:
+            condiciones.append("cantidad >= ?")
+            parametros.append(stock_minimo)
+        where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        return where, parametros
+    
+    @_lectura([])
+    def buscar_texto(self, texto, limite=50):
+        """Busca por nombre, color o tela con coincidencia de prefijos, ordenado por relevancia"""
+        terminos = re.findall(r"\w+", texto or "")
+        if not terminos:
+            return []
+        try:
+            cursor = self.conexion_lectura.cursor()
+            if self.fts_disponible:
+                # "camisa ox" → "camisa"* "ox"*: todos los términos, cada uno como prefijo
+                consulta = " ".join(f'"{t}"*' for t in terminos)
+                cursor.execute(f"""
+                    SELECT {COLUMNAS_PRODUCTO_P}
+                    FROM productos_fts f
+                    JOIN productos p ON p.id = f.rowid
+                    WHERE productos_fts MATCH ?
+                    ORDER BY bm25(productos_fts, 10.0, 2.0, 1.0)
+                    LIMIT ?
+                """, (consulta, limite))
+            else:
+                condiciones = " AND ".join(["(nombre LIKE ? OR color LIKE ? OR tipo_tela LIKE ?)"] * len(terminos))
+                parametros = []
+                for t in terminos:
+                    parametros.extend([f"%{t}%"] * 3)
+                cursor.execute(f"SELECT {COLUMNAS_PRODUCTO} FROM productos WHERE {condiciones} ORDER BY nombre LIMIT ?",
+                               parametros + [limite])
+            
+            return _leer_productos(cursor)
+        except sqlite3.Error as e:
+            print(f" Error en búsqueda de texto: {e}")
+            return []
+    
+    @_escritura(False)
     def actualizar_stock(self, producto_id, nueva_cantidad, tipo_movimiento="AJUSTE"):
         """Actualiza el stock de un producto y registra el movimiento"""
         try:
             cursor = self.conexion.cursor()
+            # Reserva la escritura antes de leer para que nadie cambie la cantidad en medio
+            cursor.execute("BEGIN IMMEDIATE")
             
             cursor.execute("SELECT cantidad FROM productos WHERE id = ?", (producto_id,))
             resultado = cursor.fetchone()
             
             if not resultado:
+                self.conexion.rollback()
                 print(" Producto no encontrado")
                 return False
             
@@ -235,6 +1315,7 @@ class BaseDatos:
             """, (producto_id, tipo_movimiento, diferencia, cantidad_anterior, nueva_cantidad))
             
             self.conexion.commit()
+            self.cache.invalidar()
             print(f" Stock actualizado: {cantidad_anterior} → {nueva_cantidad}")
             return True
         except sqlite3.Error as e:
@@ -242,28 +1323,155 @@ class BaseDatos:
             self.conexion.rollback()
             return False
     
+    @_escritura(None)
+    def ajustar_stock(self, producto_id, delta, tipo_movimiento="AJUSTE"):
+        """Suma delta al stock en una sola sentencia y devuelve la nueva cantidad (None si falla)"""
+        try:
+            cursor = self.conexion.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # La condición impide dejar el stock en negativo sin leer antes la fila
+            cursor.execute("""
+                UPDATE productos
+                SET cantidad = cantidad + ?, fecha_actualizacion = CURRENT_TIMESTAMP
+                WHERE id = ? AND cantidad >= ?
+                RETURNING cantidad
+            """, (delta, producto_id, max(0, -delta)))
+            resultado = cursor.fetchone()
+            
+            if not resultado:
+                self.conexion.rollback()
+                # Solo en el caso de fallo se consulta el motivo
+                cursor.execute("SELECT cantidad FROM productos WHERE id = ?", (producto_id,))
+                fila = cursor.fetchone()
+                if fila:
+                    print(f" Stock insuficiente. Disponible: {fila['cantidad']}")
+                else:
+                    print(" Producto no encontrado")
+                return None
+            
+            nueva_cantidad = resultado['cantidad']
+            cantidad_anterior = nueva_cantidad - delta
+            
+            cursor.execute("""
+                INSERT INTO historial_movimientos 
+                (producto_id, tipo_movimiento, cantidad, cantidad_anterior, cantidad_nueva)
+                VALUES (?, ?, ?, ?, ?)
+            """, (producto_id, tipo_movimiento, delta, cantidad_anterior, nueva_cantidad))
+            
+            self.conexion.commit()
+            self.cache.invalidar()
+            print(f" Stock actualizado: {cantidad_anterior} → {nueva_cantidad}")
+            return nueva_cantidad
+        except sqlite3.Error as e:
+            print(f" Error al ajustar stock: {e}")
+            self.conexion.rollback()
+            return None
+    
+    @_escritura({'aplicados': 0, 'rechazados': [], 'ok': False})
+    def aplicar_movimientos(self, movimientos, todo_o_nada=True):
+        """Aplica un lote de movimientos (producto_id, delta[, tipo]) en una sola transacción
+        
+        Con todo_o_nada=True cualquier movimiento inválido cancela el lote completo;
+        con False se aplican los válidos y se informan los rechazados.
+        """
+        reporte = {'aplicados': 0, 'rechazados': [], 'ok': False}
+        lote = []
+        for indice, mov in enumerate(movimientos):
+            try:
+                producto_id, delta = mov[0], mov[1]
+            except (TypeError, IndexError, KeyError):
+                reporte['rechazados'].append((indice, None, "Movimiento inválido"))
+                continue
+            # bool es subclase de int, pero True/False no son cantidades
+            if not isinstance(producto_id, int) or isinstance(producto_id, bool):
+                reporte['rechazados'].append((indice, producto_id, "ID de producto inválido"))
+                continue
+            if not isinstance(delta, int) or isinstance(delta, bool) or delta == 0:
+                reporte['rechazados'].append((indice, producto_id, "Cantidad inválida"))
+                continue
+            tipo = mov[2] if len(mov) > 2 and mov[2] else ("ENTRADA" if delta > 0 else "SALIDA")
+            lote.append((indice, producto_id, delta, tipo))
+        
+        if reporte['rechazados'] and todo_o_nada:
+            print(f" Lote cancelado: {len(reporte['rechazados'])} movimiento(s) inválido(s)")
+            return reporte
+        if not lote:
+            reporte['ok'] = not reporte['rechazados']
+            return reporte
+        
+        try:
+            cursor = self.conexion.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # Lee una sola vez el stock de todos los productos del lote
+            ids = list({producto_id for _, producto_id, _, _ in lote})
+            stock = {}
+            for i in range(0, len(ids), 500):
+                bloque = ids[i:i + 500]
+                marcas = ",".join("?" * len(bloque))
+                cursor.execute(f"SELECT id, cantidad FROM productos WHERE id IN ({marcas})", bloque)
+                stock.update((fila['id'], fila['cantidad']) for fila in cursor.fetchall())
+            
+            historial = []
+            for indice, producto_id, delta, tipo in lote:
+                if producto_id not in stock:
+                    reporte['rechazados'].append((indice, producto_id, "Producto no encontrado"))
+                    continue
+                anterior = stock[producto_id]
+                if anterior + delta < 0:
+                    reporte['rechazados'].append((indice, producto_id, f"Stock insuficiente. Disponible: {anterior}"))
+                    continue
+                stock[producto_id] = anterior + delta
+                historial.append((producto_id, tipo, delta, anterior, anterior + delta))
+            
+            if reporte['rechazados'] and todo_o_nada:
+                self.conexion.rollback()
+                print(f" Lote cancelado: {len(reporte['rechazados'])} movimiento(s) inválido(s)")
+                return reporte
+            
+            modificados = {h[0] for h in historial}
+            cursor.executemany("""
+                UPDATE productos
+                SET cantidad = ?, fecha_actualizacion = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(stock[producto_id], producto_id) for producto_id in modificados])
+            
+            cursor.executemany("""
+                INSERT INTO historial_movimientos 
+                (producto_id, tipo_movimiento, cantidad, cantidad_anterior, cantidad_nueva)
+                VALUES (?, ?, ?, ?, ?)
+            """, historial)
+            
+            self.conexion.commit()
+            self.cache.invalidar()
+            reporte['aplicados'] = len(historial)
+            reporte['ok'] = not reporte['rechazados']
+            reporte['rechazados'].sort(key=lambda rechazo: rechazo[0])
+            print(f" Movimientos aplicados: {reporte['aplicados']}, rechazados: {len(reporte['rechazados'])}")
+            return reporte
+        except sqlite3.Error as e:
+            print(f" Error al aplicar movimientos: {e}")
+            self.conexion.rollback()
+            reporte['rechazados'] += [(indice, producto_id, str(e)) for indice, producto_id, _, _ in lote]
+            reporte['rechazados'].sort(key=lambda rechazo: rechazo[0])
+            return reporte
+        except BaseException:
+            # La conexión de escritura es compartida: no puede quedar con la transacción abierta
+            self.conexion.rollback()
+            raise
+    
     def aumentar_stock(self, producto_id, cantidad):
         """Aumenta el stock de un producto"""
-        producto = self.buscar_por_id(producto_id)
-        if producto:
-            nueva_cantidad = producto.cantidad + cantidad
-            return self.actualizar_stock(producto_id, nueva_cantidad, "ENTRADA")
-        return False
+        return self.ajustar_stock(producto_id, cantidad, "ENTRADA") is not None
     
     def reducir_stock(self, producto_id, cantidad):
         """Reduce el stock de un producto"""
-        producto = self.buscar_por_id(producto_id)
-        if producto:
-            if producto.cantidad >= cantidad:
-                nueva_cantidad = producto.cantidad - cantidad
-                return self.actualizar_stock(producto_id, nueva_cantidad, "SALIDA")
-            else:
-                print(f" Stock insuficiente. Disponible: {producto.cantidad}")
-                return False
-        return False
+        return self.ajustar_stock(producto_id, -cantidad, "SALIDA") is not None
     
+    @_escritura(False)
     def eliminar_producto(self, producto_id):
-        """Elimina un producto de la base de datos"""
+        """Elimina un producto de la base de datos, con su historial (también el archivado)"""
         try:
             cursor = self.conexion.cursor()
             
@@ -272,151 +1480,517 @@ class BaseDatos:
                 print(" Producto no encontrado")
                 return False
             
+            # Antes de la transacción: ATTACH no se puede hacer dentro de una
+            archivadas = self._tablas_archivo(self.conexion)
             cursor.execute("DELETE FROM historial_movimientos WHERE producto_id = ?", (producto_id,))
+            cursor.execute("DELETE FROM historial_rollup WHERE producto_id = ?", (producto_id,))
+            for tabla in archivadas:
+                cursor.execute(f"DELETE FROM archivo.{tabla} WHERE producto_id = ?", (producto_id,))
             cursor.execute("DELETE FROM productos WHERE id = ?", (producto_id,))
             
             self.conexion.commit()
+            self.cache.invalidar()
             print(f" Producto eliminado (ID: {producto_id})")
             return True
         except sqlite3.Error as e:
             print(f" Error al eliminar producto: {e}")
             self.conexion.rollback()
             return False
+        finally:
+            self._soltar_archivo(self.conexion)
     
+    @_lectura([])
     def productos_bajo_stock(self, umbral=10):
         """Obtiene productos con stock bajo"""
         try:
-            cursor = self.conexion.cursor()
-            cursor.execute("""
-                SELECT * FROM productos 
+            cursor = self.conexion_lectura.cursor()
+            cursor.execute(f"""
+                SELECT {COLUMNAS_PRODUCTO} FROM productos 
                 WHERE cantidad <= ?
                 ORDER BY cantidad ASC
             """, (umbral,))
             
-            productos = []
-            for fila in cursor.fetchall():
-                productos.append(Producto(
-                    fila['id'], fila['nombre'], fila['tipo_tela'],
-                    fila['talla'], fila['cantidad'], fila['color']
-                ))
-            return productos
+            return _leer_productos(cursor)
         except sqlite3.Error as e:
             print(f" Error en consulta de bajo stock: {e}")
             return []
     
+    @_cacheado
+    @_lectura([])
     def resumen_por_tela(self):
         """Genera resumen de stock agrupado por tipo de tela"""
         try:
-            cursor = self.conexion.cursor()
-            cursor.execute("""
-                SELECT tipo_tela, SUM(cantidad) as total
-                FROM productos
-                GROUP BY tipo_tela
-                ORDER BY total DESC
-            """)
+            cursor = self.conexion_lectura.cursor()
+            if self.usar_resumen:
+                cursor.execute("""
+                    SELECT valor as tipo_tela, unidades as total
+                    FROM resumen_inventario
+                    WHERE dimension = 'tela'
+                    ORDER BY total DESC
+                """)
+            else:
+                cursor.execute("""
+                    SELECT tipo_tela, SUM(cantidad) as total
+                    FROM productos
+                    GROUP BY tipo_tela
+                    ORDER BY total DESC
+                """)
             return [(fila['tipo_tela'], fila['total']) for fila in cursor.fetchall()]
         except sqlite3.Error as e:
+            self._errores_lectura += 1
             print(f" Error en resumen por tela: {e}")
             return []
     
+    @_cacheado
+    @_lectura([])
     def resumen_por_talla(self):
         """Genera resumen de stock agrupado por talla"""
         try:
-            cursor = self.conexion.cursor()
-            cursor.execute("""
-                SELECT talla, SUM(cantidad) as total
-                FROM productos
-                GROUP BY talla
-                ORDER BY talla
-            """)
+            cursor = self.conexion_lectura.cursor()
+            if self.usar_resumen:
+                cursor.execute("""
+                    SELECT valor as talla, unidades as total
+                    FROM resumen_inventario
+                    WHERE dimension = 'talla'
+                    ORDER BY talla
+                """)
+            else:
+                cursor.execute("""
+                    SELECT talla, SUM(cantidad) as total
+                    FROM productos
+                    GROUP BY talla
+                    ORDER BY talla
+                """)
             return [(fila['talla'], fila['total']) for fila in cursor.fetchall()]
         except sqlite3.Error as e:
+            self._errores_lectura += 1
             print(f" Error en resumen por talla: {e}")
             return []
     
-    def obtener_historial(self, producto_id=None, limite=50):
-        """Obtiene el historial de movimientos"""
+    @staticmethod
+    def _limite_fecha(valor, fin=False):
+        """Convierte date/datetime/'AAAA-MM-DD' al texto con que se compara la columna fecha
+        
+        Una fecha sin hora usada como fin incluye el día completo (se compara con el día siguiente).
+        """
+        if isinstance(valor, str) and len(valor) == 10:
+            valor = date.fromisoformat(valor)
+        if isinstance(valor, datetime):
+            return valor.strftime("%Y-%m-%d %H:%M:%S")
+        if isinstance(valor, date):
+            return (valor + timedelta(days=1) if fin else valor).strftime("%Y-%m-%d")
+        return str(valor)
+    
+    def _adjuntar_archivo(self, conexion):
+        """Adjunta el archivo de historial como esquema 'archivo' (False si aún no existe)"""
+        adjuntos = [fila[1] for fila in conexion.execute("PRAGMA database_list")]
+        if 'archivo' in adjuntos:
+            return True
+        if self.ruta_archivo == ":memory:":
+            # Vive mientras siga adjunto a la única conexión: _soltar_archivo no lo separa
+            conexion.execute("ATTACH DATABASE ':memory:' AS archivo")
+            return True
+        if not os.path.exists(self.ruta_archivo):
+            return False
+        if conexion is self.pool.conexion_escritura:
+            conexion.execute("ATTACH DATABASE ? AS archivo", (self.ruta_archivo,))
+        else:
+            # Las conexiones de lectura se abren como URI: el archivo también se adjunta en solo lectura
+            conexion.execute("ATTACH DATABASE ? AS archivo", (_uri_solo_lectura(self.ruta_archivo),))
+        return True
+    
+    def _soltar_archivo(self, conexion):
+        """Separa el archivo de la conexión de escritura tras modificarlo (salvo si está en memoria)"""
+        if self.ruta_archivo == ":memory:":
+            return
         try:
-            cursor = self.conexion.cursor()
-            
-            if producto_id:
-                cursor.execute("""
-                    SELECT h.*, p.nombre 
-                    FROM historial_movimientos h
-                    JOIN productos p ON h.producto_id = p.id
-                    WHERE h.producto_id = ?
-                    ORDER BY h.fecha DESC
-                    LIMIT ?
-                """, (producto_id, limite))
-            else:
-                cursor.execute("""
-                    SELECT h.*, p.nombre 
-                    FROM historial_movimientos h
-                    JOIN productos p ON h.producto_id = p.id
-                    ORDER BY h.fecha DESC
-                    LIMIT ?
-                """, (limite,))
+            conexion.execute("DETACH DATABASE archivo")
+        except sqlite3.Error:
+            pass
+    
+    def _tablas_archivo(self, conexion, desde=None, hasta=None):
+        """Tablas mensuales del archivo que pueden contener movimientos entre desde y hasta"""
+        if not self._adjuntar_archivo(conexion):
+            return []
+        cursor = conexion.execute("""
+            SELECT name FROM archivo.sqlite_master
+            WHERE type = 'table' AND name LIKE 'historial\\_%' ESCAPE '\\'
+            ORDER BY name
+        """)
+        inicio = self._limite_fecha(desde)[:7] if desde else None
+        fin = self._limite_fecha(hasta, fin=True)[:7] if hasta else None
+        tablas = []
+        for (nombre,) in cursor.fetchall():
+            mes = nombre[len('historial_'):].replace('_', '-')
+            if (inicio and mes < inicio) or (fin and mes > fin):
+                continue
+            tablas.append(nombre)
+        return tablas
+    
+    @_cacheado
+    @_lectura([])
+    def obtener_historial(self, producto_id=None, limite=50, desde=None, hasta=None,
+                          tipo_movimiento=None, antes_de=None, incluir_archivo=False):
+        """Obtiene el historial de movimientos, del más reciente al más antiguo
+        
+        desde/hasta filtran por fecha (hasta incluye ese día), tipo_movimiento por tipo y
+        antes_de=(fecha, id) continúa tras la última fila de la página anterior.
+        Con incluir_archivo=True también se consultan los meses archivados del rango.
+        """
+        try:
+            cursor = self.conexion_lectura.cursor()
+            cursor.execute(*self._consulta_historial(producto_id, limite, desde, hasta, tipo_movimiento,
+                                                     antes_de, incluir_archivo))
             
-            historial = []
-            for fila in cursor.fetchall():
-                historial.append({
-                    'id': fila['id'],
-                    'producto_id': fila['producto_id'],
-                    'nombre': fila['nombre'],
-                    'tipo_movimiento': fila['tipo_movimiento'],
-                    'cantidad': fila['cantidad'],
-                    'cantidad_anterior': fila['cantidad_anterior'],
-                    'cantidad_nueva': fila['cantidad_nueva'],
-                    'fecha': fila['fecha']
-                })
-            return historial
-        except sqlite3.Error as e:
+            return [dict(fila) for fila in cursor.fetchall()]
+        except (sqlite3.Error, ValueError) as e:
+            self._errores_lectura += 1
             print(f" Error al obtener historial: {e}")
             return []
     
-    def estadisticas_generales(self):
-        """Obtiene estadísticas generales del inventario"""
+    def _consulta_historial(self, producto_id=None, limite=50, desde=None, hasta=None,
+                            tipo_movimiento=None, antes_de=None, incluir_archivo=False):
+        """Arma la consulta (sql, parametros) del historial con los filtros de obtener_historial"""
+        origen = "historial_movimientos"
+        if incluir_archivo:
+            tablas = self._tablas_archivo(self.conexion_lectura, desde, hasta)
+            if tablas:
+                partes = ["SELECT * FROM main.historial_movimientos"]
+                partes += [f"SELECT * FROM archivo.{tabla}" for tabla in tablas]
+                origen = "(" + " UNION ALL ".join(partes) + ")"
+        
+        condiciones = []
+        parametros = []
+        if producto_id:
+            condiciones.append("h.producto_id = ?")
+            parametros.append(producto_id)
+        if tipo_movimiento:
+            condiciones.append("h.tipo_movimiento = ?")
+            parametros.append(tipo_movimiento)
+        if desde:
+            condiciones.append("h.fecha >= ?")
+            parametros.append(self._limite_fecha(desde))
+        if hasta:
+            condiciones.append("h.fecha < ?" if not isinstance(hasta, datetime) else "h.fecha <= ?")
+            parametros.append(self._limite_fecha(hasta, fin=True))
+        if antes_de:
+            condiciones.append("(h.fecha, h.id) < (?, ?)")
+            parametros.extend(antes_de)
+        
+        where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        consulta = f"""
+            SELECT h.id, h.producto_id, p.nombre, h.tipo_movimiento, h.cantidad,
+                   h.cantidad_anterior, h.cantidad_nueva, h.fecha
+            FROM {origen} h
+            JOIN productos p ON h.producto_id = p.id
+            {where}
+            ORDER BY h.fecha DESC, h.id DESC
+            LIMIT ?
+        """
+        return consulta, parametros + [limite]
+    
+    @staticmethod
+    def clave_historial(movimiento):
+        """Cursor (fecha, id) de un movimiento para pedir la página siguiente del historial
+        
+        Acepta el dict de obtener_historial o una fila de historial_df (fecha ya convertida).
+        """
+        fecha = movimiento['fecha']
+        if hasattr(fecha, 'strftime'):
+            fecha = fecha.strftime("%Y-%m-%d %H:%M:%S")
+        return (fecha, int(movimiento['id']))
+    
+    @_escritura(None)
+    def archivar_historial(self, antes_de):
+        """Mueve los movimientos anteriores a antes_de al archivo, en una tabla por mes
+        
+        Antes de borrar se acumula por producto (historial_rollup) el número de movimientos,
+        la suma de cantidades y la cantidad tras el último movimiento archivado, de modo que
+        los saldos siguen siendo reconstruibles. Las tablas del archivo conservan el id
+        original, así que repetir un archivado interrumpido no duplica filas.
+        Devuelve el número de movimientos archivados (None si falla).
+        """
+        corte = self._limite_fecha(antes_de)
+        cursor = self.conexion.cursor()
         try:
-            cursor = self.conexion.cursor()
-            stats = {}
+            if self.ruta_archivo != ":memory:" and not os.path.exists(self.ruta_archivo):
+                sqlite3.connect(self.ruta_archivo).close()
+            self._adjuntar_archivo(self.conexion)
+            cursor.execute("BEGIN IMMEDIATE")
             
-            cursor.execute("SELECT COUNT(*) as total FROM productos")
-            stats['total_productos'] = cursor.fetchone()['total']
+            cursor.execute("""
+                SELECT DISTINCT substr(fecha, 1, 7) FROM historial_movimientos
+                WHERE fecha < ? ORDER BY 1
+            """, (corte,))
+            meses = [fila[0] for fila in cursor.fetchall()]
+            if not meses:
+                self.conexion.rollback()
+                print(" No hay movimientos para archivar")
+                return 0
             
-            cursor.execute("SELECT SUM(cantidad) as total FROM productos")
-            stats['total_unidades'] = cursor.fetchone()['total'] or 0
+            for mes in meses:
+                tabla = "historial_" + mes.replace('-', '_')
+                cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS archivo.{tabla} (
+                        id INTEGER PRIMARY KEY,
+                        producto_id INTEGER NOT NULL,
+                        tipo_movimiento TEXT NOT NULL,
+                        cantidad INTEGER NOT NULL,
+                        cantidad_anterior INTEGER,
+                        cantidad_nueva INTEGER,
+                        usuario TEXT,
+                        fecha TIMESTAMP
+                    )
+                """)
+                cursor.execute(f"""
+                    CREATE INDEX IF NOT EXISTS archivo.idx_{tabla}_fecha ON {tabla}(fecha, id)
+                """)
+                cursor.execute(f"""
+                    CREATE INDEX IF NOT EXISTS archivo.idx_{tabla}_producto ON {tabla}(producto_id, fecha, id)
+                """)
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO archivo.{tabla}
+                    SELECT id, producto_id, tipo_movimiento, cantidad, cantidad_anterior,
+                           cantidad_nueva, usuario, fecha
+                    FROM historial_movimientos
+                    WHERE fecha >= ? AND fecha < ? AND fecha < ?
+                """, (mes, mes + "-32", corte))
             
-            cursor.execute("SELECT COUNT(DISTINCT tipo_tela) as total FROM productos")
-            stats['tipos_tela'] = cursor.fetchone()['total']
+            cursor.execute("""
+                INSERT INTO historial_rollup
+                    (producto_id, movimientos, suma_cantidad, primera_fecha, ultima_fecha, cantidad_al_corte)
+                SELECT h.producto_id, COUNT(*), SUM(h.cantidad), MIN(h.fecha), MAX(h.fecha),
+                       (SELECT u.cantidad_nueva FROM historial_movimientos u
+                        WHERE u.producto_id = h.producto_id AND u.fecha < ?
+                        ORDER BY u.fecha DESC, u.id DESC LIMIT 1)
+                FROM historial_movimientos h
+                WHERE h.fecha < ?
+                GROUP BY h.producto_id
+                ON CONFLICT (producto_id) DO UPDATE SET
+                    movimientos = movimientos + excluded.movimientos,
+                    suma_cantidad = suma_cantidad + excluded.suma_cantidad,
+                    primera_fecha = MIN(primera_fecha, excluded.primera_fecha),
+                    ultima_fecha = excluded.ultima_fecha,
+                    cantidad_al_corte = excluded.cantidad_al_corte
+            """, (corte, corte))
             
-            cursor.execute("SELECT COUNT(DISTINCT talla) as total FROM productos")
-            stats['tallas'] = cursor.fetchone()['total']
+            cursor.execute("DELETE FROM historial_movimientos WHERE fecha < ?", (corte,))
+            archivados = cursor.rowcount
+            # El borrado anotó una entrada por movimiento en registro_cambios
+            self._podar_cambios(cursor, CAMBIOS_CONSERVADOS)
             
-            cursor.execute("SELECT COUNT(*) as total FROM productos WHERE cantidad = 0")
-            stats['sin_stock'] = cursor.fetchone()['total']
+            self.conexion.commit()
+            self.cache.invalidar()
+            print(f" {archivados} movimientos archivados en {len(meses)} mes(es): {self.ruta_archivo}")
+            return archivados
+        except sqlite3.Error as e:
+            print(f" Error al archivar historial: {e}")
+            self.conexion.rollback()
+            return None
+        finally:
+            self._soltar_archivo(self.conexion)
+    
+    @_lectura([])
+    def obtener_rollup(self, producto_id=None):
+        """Acumulados de los movimientos archivados (por producto o todos)"""
+        try:
+            cursor = self.conexion_lectura.cursor()
+            if producto_id:
+                cursor.execute("SELECT * FROM historial_rollup WHERE producto_id = ?", (producto_id,))
+            else:
+                cursor.execute("SELECT * FROM historial_rollup ORDER BY producto_id")
+            return [dict(fila) for fila in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f" Error al obtener acumulados del archivo: {e}")
+            return []
+    
+    @_cacheado
+    @_lectura({})
+    def estadisticas_generales(self):
+        """Obtiene estadísticas generales del inventario"""
+        try:
+            cursor = self.conexion_lectura.cursor()
             
-            return stats
+            if self.usar_resumen:
+                # Lee los contadores mantenidos por triggers: O(número de grupos)
+                cursor.execute("""
+                    SELECT
+                        COALESCE(SUM(CASE WHEN dimension = 'tela' THEN productos END), 0) as total_productos,
+                        COALESCE(SUM(CASE WHEN dimension = 'tela' THEN unidades END), 0) as total_unidades,
+                        COUNT(CASE WHEN dimension = 'tela' THEN 1 END) as tipos_tela,
+                        COUNT(CASE WHEN dimension = 'talla' THEN 1 END) as tallas,
+                        COALESCE(SUM(CASE WHEN dimension = 'tela' THEN sin_stock END), 0) as sin_stock
+                    FROM resumen_inventario
+                """)
+            else:
+                # Una sola pasada sobre productos para todas las métricas
+                cursor.execute("""
+                    SELECT
+                        COUNT(*) as total_productos,
+                        COALESCE(SUM(cantidad), 0) as total_unidades,
+                        COUNT(DISTINCT tipo_tela) as tipos_tela,
+                        COUNT(DISTINCT talla) as tallas,
+                        COALESCE(SUM(cantidad = 0), 0) as sin_stock
+                    FROM productos
+                """)
+            
+            return dict(cursor.fetchone())
         except sqlite3.Error as e:
+            self._errores_lectura += 1
             print(f" Error al obtener estadísticas: {e}")
             return {}
     
-    def crear_respaldo(self, ruta_respaldo=None):
-        """Crea una copia de respaldo de la base de datos"""
+    # ---- Resultados como DataFrame (pandas se importa solo al usarlos) ----
+    
+    def _dataframe(self, consulta, parametros=(), tipos=None):
+        """Ejecuta una lectura y arma el DataFrame directamente con las tuplas del cursor
+        
+        tipos indica el dtype de algunas columnas ('datetime' convierte el texto de SQLite).
+        Si la consulta falla se devuelve un DataFrame vacío.
+        """
+        pd = _pandas()
+        tipos = tipos or {}
+        try:
+            with self.pool.lectura() as conexion:
+                cursor = conexion.cursor()
+                cursor.row_factory = None
+                cursor.execute(consulta, parametros)
+                columnas = [descripcion[0] for descripcion in cursor.description]
+                df = pd.DataFrame.from_records(cursor.fetchall(), columns=columnas)
+        except sqlite3.Error as e:
+            self._errores_lectura += 1
+            print(f" Error al leer DataFrame: {e}")
+            df = pd.DataFrame(columns=list(tipos))
+        return _aplicar_tipos(df, tipos)
+    
+    @_cacheado
+    def productos_df(self, ordenar_por="id", tipo_tela=None, talla=None, stock_minimo=None):
+        """Productos como DataFrame, con los mismos filtros que buscar_combinado"""
+        orden_valido = ordenar_por if ordenar_por in COLUMNAS_ORDEN else 'id'
+        where, parametros = self._filtros_productos(tipo_tela, talla, stock_minimo)
+        return self._dataframe(
+            f"SELECT {COLUMNAS_PRODUCTO} FROM productos {where} ORDER BY {orden_valido}, id",
+            parametros, TIPOS_PRODUCTO
+        )
+    
+    @_cacheado
+    def historial_df(self, producto_id=None, limite=50, desde=None, hasta=None,
+                     tipo_movimiento=None, antes_de=None, incluir_archivo=False):
+        """Historial como DataFrame, con los mismos filtros que obtener_historial"""
+        try:
+            with self.pool.lectura():
+                consulta, parametros = self._consulta_historial(producto_id, limite, desde, hasta,
+                                                                 tipo_movimiento, antes_de, incluir_archivo)
+                return self._dataframe(consulta, parametros, TIPOS_HISTORIAL)
+        except (sqlite3.Error, ValueError) as e:
+            self._errores_lectura += 1
+            print(f" Error al obtener historial: {e}")
+            return _aplicar_tipos(_pandas().DataFrame(columns=list(TIPOS_HISTORIAL)), TIPOS_HISTORIAL)
+    
+    @_cacheado
+    def resumen_df(self, dimension="tela"):
+        """Unidades por tela o por talla como DataFrame (columnas: valor, total)"""
+        if dimension not in ('tela', 'talla'):
+            raise ValueError(f"Dimensión no válida: {dimension}")
+        if self.usar_resumen:
+            consulta = """
+                SELECT valor, unidades as total FROM resumen_inventario
+                WHERE dimension = ? ORDER BY """ + ("total DESC" if dimension == 'tela' else "valor")
+            parametros = (dimension,)
+        else:
+            columna = 'tipo_tela' if dimension == 'tela' else 'talla'
+            consulta = f"""
+                SELECT {columna} as valor, SUM(cantidad) as total FROM productos
+                GROUP BY {columna} ORDER BY """ + ("total DESC" if dimension == 'tela' else "valor")
+            parametros = ()
+        return self._dataframe(consulta, parametros, {'valor': object, 'total': 'int64'})
+    
+    def crear_respaldo(self, ruta_respaldo=None, paginas_por_paso=256, pausa=0.005, comprimir=False,
+                       conservar=None, verificar=True, progreso=None):
+        """Crea una copia de respaldo consistente con la API de backup de SQLite
+        
+        Copia paginas_por_paso páginas por paso y espera pausa segundos entre pasos, así los
+        escritores no quedan bloqueados. Con comprimir=True se guarda como .db.gz, con
+        conservar=N solo se mantienen los N respaldos más recientes y con verificar=True se
+        ejecuta PRAGMA integrity_check sobre la copia. progreso(copiadas, total) informa el avance.
+        Devuelve la ruta del respaldo o False si falla.
+        """
+        directorio = os.path.dirname(self.ruta_db) or "."
         if not ruta_respaldo:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            ruta_respaldo = f"datos/respaldo_inventario_{timestamp}.db"
+            ruta_respaldo = os.path.join(directorio, f"respaldo_inventario_{timestamp}.db")
+        ruta_copia = ruta_respaldo[:-3] if ruta_respaldo.endswith(".gz") else ruta_respaldo
+        
+        def avance(estado, restantes, total):
+            if progreso:
+                progreso(total - restantes, total)
+            # Entre pasos se cede la conexión para que las escrituras no esperen al respaldo
+            self.pool.ceder_escritura(pausa)
         
+        destino = None
         try:
-            import shutil
-            shutil.copy2(self.ruta_db, ruta_respaldo)
+            destino = sqlite3.connect(ruta_copia)
+            # Se copia desde la conexión de escritura: sus cambios se reflejan en el respaldo
+            # en curso, mientras que los de otra conexión lo reiniciarían desde el principio
+            with self.pool.escritura() as origen:
+                origen.backup(destino, pages=paginas_por_paso, progress=avance)
+            
+            if verificar:
+                resultado = destino.execute("PRAGMA integrity_check").fetchone()[0]
+                if resultado != "ok":
+                    raise sqlite3.DatabaseError(f"integridad del respaldo: {resultado}")
+            destino.close()
+            destino = None
+            
+            if comprimir:
+                ruta_respaldo = ruta_copia + ".gz"
+                with open(ruta_copia, "rb") as entrada, gzip.open(ruta_respaldo, "wb") as salida:
+                    shutil.copyfileobj(entrada, salida, 1024 * 1024)
+                os.remove(ruta_copia)
+            else:
+                ruta_respaldo = ruta_copia
+            
             print(f" Respaldo creado: {ruta_respaldo}")
-            return True
+            if conservar:
+                self.rotar_respaldos(conservar, os.path.dirname(ruta_respaldo) or ".")
+            return ruta_respaldo
         except Exception as e:
             print(f" Error al crear respaldo: {e}")
+            if destino is not None:
+                destino.close()
+            if os.path.exists(ruta_copia):
+                os.remove(ruta_copia)
             return False
     
+    def interrumpir_lectura(self, hilo):
+        """Cancela la lectura que está haciendo el hilo hilo (su método devuelve el valor por defecto)"""
+        return self.pool.interrumpir_lectura(hilo)
+    
+    def respaldo_en_segundo_plano(self, **opciones):
+        """Lanza crear_respaldo en un hilo aparte y devuelve un Future con su resultado"""
+        with self._bloqueo_respaldo:
+            if self._ejecutor_respaldo is None:
+                self._ejecutor_respaldo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="respaldo")
+        return self._ejecutor_respaldo.submit(self.crear_respaldo, **opciones)
+    
+    def rotar_respaldos(self, conservar, directorio=None):
+        """Borra los respaldo_inventario_* más antiguos dejando solo los últimos `conservar`"""
+        directorio = directorio or os.path.dirname(self.ruta_db) or "."
+        respaldos = sorted(
+            (os.path.join(directorio, nombre) for nombre in os.listdir(directorio)
+             if nombre.startswith("respaldo_inventario_") and (nombre.endswith(".db") or nombre.endswith(".db.gz"))),
+            key=os.path.getmtime
+        )
+        borrados = respaldos[:-conservar] if conservar > 0 else respaldos
+        for ruta in borrados:
+            os.remove(ruta)
+            print(f" Respaldo antiguo eliminado: {ruta}")
+        return len(borrados)
+    
     def cerrar(self):
-        """Cierra la conexión a la base de datos"""
-        if self.conexion:
-            self.conexion.close()
+        """Cierra las conexiones a la base de datos"""
+        if self._ejecutor_respaldo is not None:
+            self._ejecutor_respaldo.shutdown(wait=True)
+        if self.pool:
+            self.pool.cerrar()
             print(" Conexión cerrada")
\ No newline at end of file
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""Exportación del inventario por bloques, directamente desde la base de datos"""
+
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+
+# Columna en la base de datos → encabezado en el archivo exportado
+COLUMNAS_EXPORTACION = [
+    ('id', 'ID'),
+    ('nombre', 'Nombre'),
+    ('tipo_tela', 'TipoTela'),
+    ('talla', 'Talla'),
+    ('color', 'Color'),
+    ('cantidad', 'Stock'),
+]
+
+
+def csv_por_bloques(bd, ordenar_por='nombre', tamano_bloque=2000, encoding='utf-8'):
+    """Genera el CSV del inventario como bloques de bytes, uno por bloque de filas
+
+    Solo hay en memoria un bloque de filas y su texto a la vez, sin importar el
+    tamaño del inventario.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow([encabezado for _, encabezado in COLUMNAS_EXPORTACION])
+
+    columnas = [columna for columna, _ in COLUMNAS_EXPORTACION]
+    for filas in bd.iterar_productos(ordenar_por, tamano_bloque, columnas):
+        escritor.writerows(filas)
+        yield buffer.getvalue().encode(encoding)
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        # Inventario vacío: solo queda el encabezado
+        yield buffer.getvalue().encode(encoding)
+
+
+def exportar_csv(bd, destino, ordenar_por='nombre', tamano_bloque=2000):
+    """Escribe el CSV del inventario en destino (ruta o archivo binario abierto)
+
+    Devuelve la cantidad de bytes escritos.
+    """
+    if isinstance(destino, str):
+        with open(destino, 'wb') as archivo:
+            return exportar_csv(bd, archivo, ordenar_por, tamano_bloque)
+
+    escritos = 0
+    for bloque in csv_por_bloques(bd, ordenar_por, tamano_bloque):
+        destino.write(bloque)
+        escritos += len(bloque)
+    return escritos
+
+
+def csv_temporal(bd, ordenar_por='nombre', tamano_bloque=2000):
+    """Exporta el CSV a un archivo temporal y devuelve su ruta
+
+    Pensado para st.download_button: se le pasa el archivo abierto en lugar de
+    construir el CSV completo en memoria. El llamador debe borrar el archivo.
+    """
+    descriptor, ruta = tempfile.mkstemp(prefix='inventario_', suffix='.csv')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            exportar_csv(bd, archivo, ordenar_por, tamano_bloque)
+    except Exception:
+        os.remove(ruta)
+        raise
+    return ruta
+
+
+# Columnas del informe PDF: (columna, encabezado, ancho en mm, alineación)
+COLUMNAS_PDF = [
+    ('id', 'ID', 18, 'R'),
+    ('nombre', 'Nombre', 92, 'L'),
+    ('tipo_tela', 'Tipo de tela', 55, 'L'),
+    ('talla', 'Talla', 25, 'C'),
+    ('color', 'Color', 55, 'L'),
+    ('cantidad', 'Stock', 32, 'R'),
+]
+
+MODOS_PDF = ('detalle', 'agrupado', 'resumen')
+
+
+class InformePDF:
+    """Maqueta un informe tabular en A4 apaisado con fpdf2
+
+    Los anchos de columna, sus bordes y los límites de texto se calculan una sola vez;
+    las filas se escriben sin salto de página automático y el encabezado de la tabla se
+    repite al comenzar cada página.
+    """
+
+    ALTO_FILA = 6
+    MARGEN = 10
+
+    def __init__(self, titulo, columnas=COLUMNAS_PDF):
+        try:
+            from fpdf import FPDF
+        except ImportError:
+            raise RuntimeError("Instala fpdf2 para exportar PDF (pip install fpdf2)")
+        self.pdf = FPDF(orientation='L', unit='mm', format='A4')
+        self.pdf.set_margins(self.MARGEN, self.MARGEN)
+        self.pdf.set_auto_page_break(False)
+        self.titulo = titulo
+        self.columnas = columnas
+        self.limite_y = self.pdf.h - self.MARGEN - self.ALTO_FILA
+        self.pdf.set_font("Helvetica", size=8)
+        # Texto de hasta `seguro` caracteres cabe siempre; solo el más largo se mide
+        ancho_maximo = self.pdf.get_string_width("W")
+        self._seguros = [max(1, int((ancho - 2) / ancho_maximo)) for _, _, ancho, _ in columnas]
+        self.pdf.set_font("Helvetica", size=9)
+        # Posición x del borde izquierdo de cada columna y, al final, del borde derecho
+        self._bordes = [self.MARGEN]
+        for _, _, ancho, _ in columnas:
+            self._bordes.append(self._bordes[-1] + ancho)
+        self._tabla_abierta = False
+        self._inicio_rejilla = 0
+
+    @staticmethod
+    def _texto(valor):
+        """Texto representable con las fuentes estándar (latin-1)"""
+        return str(valor if valor is not None else "").encode('latin-1', 'replace').decode('latin-1')
+
+    def _recortar(self, texto, ancho, seguro):
+        """Recorta el texto con "..." para que quepa en la celda"""
+        if len(texto) <= seguro:
+            return texto
+        disponible = ancho - 2
+        if self.pdf.get_string_width(texto) <= disponible:
+            return texto
+        while texto and self.pdf.get_string_width(texto + "...") > disponible:
+            texto = texto[:-1]
+        return texto + "..."
+
+    def nueva_pagina(self):
+        """Abre una página con el título y, si hay una tabla en curso, su encabezado"""
+        if self._tabla_abierta:
+            self._cerrar_rejilla()
+        self.pdf.add_page()
+        self.pdf.set_font("Helvetica", "B", 12)
+        self.pdf.cell(0, 8, self._texto(self.titulo), align='L')
+        self.pdf.set_x(self.MARGEN)
+        self.pdf.set_font("Helvetica", size=8)
+        self.pdf.cell(0, 8, f"Página {self.pdf.page_no()}", align='R')
+        self.pdf.ln(10)
+        if self._tabla_abierta:
+            self._encabezado()
+
+    def _encabezado(self):
+        """Fila de encabezados de la tabla"""
+        self.pdf.set_font("Helvetica", "B", 9)
+        self.pdf.set_fill_color(230, 230, 230)
+        for _, encabezado, ancho, _ in self.columnas:
+            self.pdf.cell(ancho, self.ALTO_FILA + 1, encabezado, border=1, align='C', fill=True)
+        self.pdf.ln(self.ALTO_FILA + 1)
+        self.pdf.set_font("Helvetica", size=8)
+        self._inicio_rejilla = self.pdf.get_y()
+
+    def _cerrar_rejilla(self):
+        """Dibuja de una vez las líneas verticales de las filas escritas en la página"""
+        y = self.pdf.get_y()
+        if y > self._inicio_rejilla:
+            for x in self._bordes:
+                self.pdf.line(x, self._inicio_rejilla, x, y)
+
+    def abrir_tabla(self):
+        """Empieza una tabla; su encabezado se repetirá en cada página nueva"""
+        if self.pdf.page_no() == 0 or self.pdf.get_y() > self.limite_y - self.ALTO_FILA:
+            self._tabla_abierta = False
+            self.nueva_pagina()
+        self._tabla_abierta = True
+        self._encabezado()
+
+    def cerrar_tabla(self):
+        """Termina la tabla en curso"""
+        self._cerrar_rejilla()
+        self._tabla_abierta = False
+        self.pdf.ln(2)
+
+    def _asegurar_espacio(self, filas=1):
+        """Pasa de página si no caben `filas` filas más"""
+        if self.pdf.page_no() == 0 or self.pdf.get_y() + (filas - 1) * self.ALTO_FILA > self.limite_y:
+            self.nueva_pagina()
+
+    def fila(self, valores):
+        """Escribe una fila de la tabla, pasando de página si hace falta
+
+        Se escribe texto suelto y una sola línea horizontal por fila en lugar de una
+        celda con borde por valor, que es mucho más costoso en fpdf2.
+        """
+        self._asegurar_espacio()
+        pdf = self.pdf
+        y = pdf.get_y()
+        linea_base = y + self.ALTO_FILA - 1.8
+        for valor, x, (_, _, ancho, alineacion), seguro in zip(valores, self._bordes, self.columnas, self._seguros):
+            texto = self._recortar(self._texto(valor), ancho, seguro)
+            if alineacion == 'L':
+                pdf.text(x + 1, linea_base, texto)
+            else:
+                sobrante = ancho - 2 - pdf.get_string_width(texto)
+                pdf.text(x + 1 + (sobrante if alineacion == 'R' else sobrante / 2), linea_base, texto)
+        pdf.line(self.MARGEN, y + self.ALTO_FILA, self._bordes[-1], y + self.ALTO_FILA)
+        pdf.set_y(y + self.ALTO_FILA)
+
+    def subtitulo(self, texto):
+        """Línea destacada (título de grupo o de sección), sin quedar sola al pie de página"""
+        self._asegurar_espacio(3)
+        self.pdf.set_font("Helvetica", "B", 10)
+        self.pdf.cell(0, self.ALTO_FILA + 1, self._texto(texto))
+        self.pdf.ln(self.ALTO_FILA + 1)
+        self.pdf.set_font("Helvetica", size=8)
+
+    def texto(self, texto):
+        """Línea de texto simple"""
+        self._asegurar_espacio()
+        self.pdf.set_font("Helvetica", size=9)
+        self.pdf.cell(0, self.ALTO_FILA, self._texto(texto))
+        self.pdf.ln(self.ALTO_FILA)
+        self.pdf.set_font("Helvetica", size=8)
+
+    def salida(self):
+        """Bytes del documento"""
+        if self.pdf.page_no() == 0:
+            self.nueva_pagina()
+        return bytes(self.pdf.output())
+
+
+def _seccion_resumen(informe, bd):
+    """Totales generales y resúmenes por tela y por talla"""
+    estadisticas = bd.estadisticas_generales()
+    informe.subtitulo("Resumen general")
+    informe.texto(f"Productos: {estadisticas.get('total_productos', 0)}   "
+                  f"Unidades: {estadisticas.get('total_unidades', 0)}   "
+                  f"Sin stock: {estadisticas.get('sin_stock', 0)}")
+    for titulo, filas in (("Unidades por tipo de tela", bd.resumen_por_tela()),
+                          ("Unidades por talla", bd.resumen_por_talla())):
+        informe.subtitulo(titulo)
+        for valor, total in filas:
+            informe.texto(f"{valor}: {total}")
+
+
+def pdf_inventario(bd, modo='detalle', agrupar_por='tipo_tela', tamano_bloque=2000, progreso=None):
+    """Genera el informe PDF del inventario y devuelve sus bytes
+
+    modo 'detalle' lista todos los productos por nombre, 'agrupado' los lista por
+    agrupar_por ('tipo_tela' o 'talla') con subtotales y 'resumen' solo incluye los
+    totales. progreso(filas, total) se llama tras cada bloque de filas.
+    """
+    if modo not in MODOS_PDF:
+        raise ValueError(f"Modo de informe no válido: {modo}")
+    if agrupar_por not in ('tipo_tela', 'talla'):
+        raise ValueError(f"No se puede agrupar por: {agrupar_por}")
+
+    informe = InformePDF("Inventario - Exportado: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    _seccion_resumen(informe, bd)
+    if modo == 'resumen':
+        return informe.salida()
+
+    total = bd.contar_productos()
+    columnas = [columna for columna, _, _, _ in COLUMNAS_PDF]
+    escritas = 0
+    if modo == 'detalle':
+        informe.subtitulo("Productos")
+        informe.abrir_tabla()
+        for filas in bd.iterar_productos('nombre', tamano_bloque, columnas):
+            for fila in filas:
+                informe.fila(fila)
+            escritas += len(filas)
+            if progreso:
+                progreso(escritas, total)
+        informe.cerrar_tabla()
+    else:
+        posicion = columnas.index(agrupar_por)
+        posicion_cantidad = columnas.index('cantidad')
+        grupo = None
+        productos_grupo = unidades_grupo = 0
+
+        def cerrar_grupo():
+            informe.cerrar_tabla()
+            informe.texto(f"Subtotal {grupo}: {productos_grupo} productos, {unidades_grupo} unidades")
+
+        for filas in bd.iterar_productos(agrupar_por, tamano_bloque, columnas):
+            for fila in filas:
+                if fila[posicion] != grupo:
+                    if grupo is not None:
+                        cerrar_grupo()
+                    grupo = fila[posicion]
+                    productos_grupo = unidades_grupo = 0
+                    informe.subtitulo(f"{'Tela' if agrupar_por == 'tipo_tela' else 'Talla'}: {grupo}")
+                    informe.abrir_tabla()
+                informe.fila(fila)
+                productos_grupo += 1
+                unidades_grupo += fila[posicion_cantidad]
+            escritas += len(filas)
+            if progreso:
+                progreso(escritas, total)
+        if grupo is not None:
+            cerrar_grupo()
+
+    return informe.salida()
+
+
+# Columnas de la hoja de historial: (clave del movimiento, encabezado)
+COLUMNAS_HISTORIAL = [
+    ('id', 'ID'),
+    ('fecha', 'Fecha'),
+    ('producto_id', 'ProductoID'),
+    ('nombre', 'Nombre'),
+    ('tipo_movimiento', 'Tipo'),
+    ('cantidad', 'Cantidad'),
+    ('cantidad_anterior', 'Anterior'),
+    ('cantidad_nueva', 'Nueva'),
+]
+
+
+def exportar_excel(bd, destino, ordenar_por='nombre', incluir_resumen=True, movimientos=0,
+                   tamano_bloque=2000, progreso=None):
+    """Escribe el inventario en un .xlsx con hojas de solo escritura de openpyxl
+
+    Las filas pasan del cursor a la hoja por bloques y openpyxl las vuelca al disco a
+    medida que llegan, así la memoria no crece con el tamaño del inventario. Con
+    incluir_resumen=True se agregan hojas por tela y por talla y con movimientos=N una
+    hoja con los N movimientos más recientes. destino es una ruta o un archivo binario.
+    Devuelve la cantidad de productos exportados.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("Instala openpyxl para exportar Excel (pip install openpyxl)")
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Inventario")
+    hoja.append([encabezado for _, encabezado in COLUMNAS_EXPORTACION])
+    total = bd.contar_productos() if progreso else 0
+    columnas = [columna for columna, _ in COLUMNAS_EXPORTACION]
+    escritas = 0
+    for filas in bd.iterar_productos(ordenar_por, tamano_bloque, columnas):
+        for fila in filas:
+            hoja.append(fila)
+        escritas += len(filas)
+        if progreso:
+            progreso(escritas, total)
+
+    if incluir_resumen:
+        for titulo, encabezado, filas in (("Resumen por tela", "TipoTela", bd.resumen_por_tela()),
+                                          ("Resumen por talla", "Talla", bd.resumen_por_talla())):
+            hoja = libro.create_sheet(titulo)
+            hoja.append([encabezado, "Unidades"])
+            for fila in filas:
+                hoja.append(list(fila))
+
+    if movimientos > 0:
+        hoja = libro.create_sheet("Historial")
+        hoja.append([encabezado for _, encabezado in COLUMNAS_HISTORIAL])
+        antes_de = None
+        pendientes = movimientos
+        while pendientes > 0:
+            pagina = bd.obtener_historial(limite=min(tamano_bloque, pendientes), antes_de=antes_de)
+            for movimiento in pagina:
+                hoja.append([movimiento[clave] for clave, _ in COLUMNAS_HISTORIAL])
+            if len(pagina) < min(tamano_bloque, pendientes):
+                break
+            pendientes -= len(pagina)
+            antes_de = bd.clave_historial(pagina[-1])
+
+    libro.save(destino)
+    return escritas
+
+
+def pdf_temporal(bd, **opciones):
+    """Genera el informe PDF en un archivo temporal y devuelve su ruta (el llamador debe borrarlo)"""
+    datos = pdf_inventario(bd, **opciones)
+    descriptor, ruta = tempfile.mkstemp(prefix='inventario_', suffix='.pdf')
+    with os.fdopen(descriptor, 'wb') as archivo:
+        archivo.write(datos)
+    return ruta
+
+
+def excel_temporal(bd, **opciones):
+    """Exporta el Excel a un archivo temporal y devuelve su ruta (el llamador debe borrarlo)"""
+    descriptor, ruta = tempfile.mkstemp(prefix='inventario_', suffix='.xlsx')
+    os.close(descriptor)
+    try:
+        exportar_excel(bd, ruta, **opciones)
+    except Exception:
+        os.remove(ruta)
+        raise
+    return ruta
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Importación masiva de productos desde CSV o Excel"""
+
+import csv
+import io
+import os
+import time
+
+from base_datos import normalizar_tela, normalizar_talla
+
+# Nombres de columna aceptados en el archivo → campo del producto
+ALIAS_COLUMNAS = {
+    'nombre': 'nombre',
+    'producto': 'nombre',
+    'tipo_tela': 'tipo_tela',
+    'tipotela': 'tipo_tela',
+    'tela': 'tipo_tela',
+    'talla': 'talla',
+    'cantidad': 'cantidad',
+    'stock': 'cantidad',
+    'color': 'color',
+}
+
+
+def _normalizar_encabezado(encabezado):
+    """Traduce los encabezados del archivo a los campos del producto"""
+    campos = []
+    for col in encabezado:
+        clave = str(col or '').strip().lower().replace(' ', '_')
+        campos.append(ALIAS_COLUMNAS.get(clave, clave))
+    return campos
+
+
+def _formato(origen, formato=None):
+    """Deduce el formato ('csv' o 'xlsx') a partir de la extensión"""
+    if formato:
+        return formato.lower()
+    nombre = origen if isinstance(origen, str) else getattr(origen, 'name', '')
+    extension = os.path.splitext(nombre)[1].lower()
+    return 'xlsx' if extension in ('.xlsx', '.xlsm') else 'csv'
+
+
+def _filas_csv(origen):
+    """Genera (numero_linea, valores) desde un CSV sin cargarlo completo"""
+    if isinstance(origen, str):
+        archivo = open(origen, newline='', encoding='utf-8-sig')
+    else:
+        archivo = io.TextIOWrapper(origen, encoding='utf-8-sig', newline='')
+    try:
+        lector = csv.reader(archivo)
+        for numero, valores in enumerate(lector, start=1):
+            yield numero, valores
+    finally:
+        if isinstance(origen, str):
+            archivo.close()
+        else:
+            # Evita cerrar el archivo del llamador al destruir el envoltorio
+            archivo.detach()
+
+
+def _filas_xlsx(origen):
+    """Genera (numero_fila, valores) desde la primera hoja de un Excel en modo lectura"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("Instala openpyxl para importar Excel (pip install openpyxl)")
+    libro = load_workbook(origen, read_only=True, data_only=True)
+    try:
+        hoja = libro.worksheets[0]
+        for numero, valores in enumerate(hoja.iter_rows(values_only=True), start=1):
+            yield numero, list(valores)
+    finally:
+        libro.close()
+
+
+def _entero(valor):
+    """Entero de una celda ("3", 3 o 3.0 de Excel); None si está vacía o no es entera"""
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, int):
+        return valor
+    try:
+        numero = float(str(valor).strip())
+    except (TypeError, ValueError):
+        return None
+    return int(numero) if numero.is_integer() else None
+
+
+def validar_fila(fila):
+    """Valida una fila igual que Inventario.agregar_producto
+
+    Devuelve (tupla_para_insertar, None) o (None, motivo_de_rechazo).
+    """
+    nombre = str(fila.get('nombre') or '').strip()
+    tipo_tela = str(fila.get('tipo_tela') or '').strip()
+    talla = str(fila.get('talla') or '').strip()
+    color = str(fila.get('color') or '').strip() or "N/A"
+
+    if not nombre or not tipo_tela or not talla:
+        return None, "Todos los campos son obligatorios"
+
+    cantidad = _entero(fila.get('cantidad'))
+    if cantidad is None:
+        return None, "La cantidad debe ser un número entero"
+
+    if cantidad < 0:
+        return None, "La cantidad no puede ser negativa"
+
+    return (nombre, normalizar_tela(tipo_tela), normalizar_talla(talla), cantidad, color), None
+
+
+def leer_lotes(origen, tamano_lote=5000, formato=None):
+    """Lee el archivo por lotes: genera (filas_validas, rechazadas) de hasta tamano_lote filas"""
+    filas = _filas_xlsx(origen) if _formato(origen, formato) == 'xlsx' else _filas_csv(origen)
+
+    campos = None
+    validas, rechazadas = [], []
+    for numero, valores in filas:
+        if campos is None:
+            campos = _normalizar_encabezado(valores)
+            continue
+        if not any(v not in (None, '') for v in valores):
+            continue
+
+        tupla, motivo = validar_fila(dict(zip(campos, valores)))
+        if tupla:
+            validas.append(tupla)
+        else:
+            rechazadas.append((numero, motivo))
+
+        if len(validas) >= tamano_lote:
+            yield validas, rechazadas
+            validas, rechazadas = [], []
+
+    if validas or rechazadas:
+        yield validas, rechazadas
+
+
+def importar_productos(bd, origen, tamano_lote=5000, formato=None, progreso=None):
+    """Importa productos a la base de datos en transacciones por lote
+
+    origen puede ser una ruta o un archivo binario abierto (p. ej. el de st.file_uploader).
+    progreso(insertadas, rechazadas) se llama al terminar cada lote.
+    """
+    reporte = {'insertadas': 0, 'rechazadas': [], 'segundos': 0.0, 'filas_por_segundo': 0.0}
+    inicio = time.perf_counter()
+
+    for validas, rechazadas in leer_lotes(origen, tamano_lote, formato):
+        reporte['rechazadas'].extend(rechazadas)
+        if validas:
+            insertadas = bd.insertar_productos_lote(validas)
+            if insertadas is None:
+                reporte['rechazadas'].append((None, f"Lote de {len(validas)} filas no insertado"))
+            else:
+                reporte['insertadas'] += insertadas
+        if progreso:
+            progreso(reporte['insertadas'], len(reporte['rechazadas']))
+
+    reporte['segundos'] = time.perf_counter() - inicio
+    if reporte['segundos'] > 0:
+        reporte['filas_por_segundo'] = reporte['insertadas'] / reporte['segundos']
+
+    print(f" Importación: {reporte['insertadas']} productos, {len(reporte['rechazadas'])} rechazados "
+          f"({reporte['filas_por_segundo']:.0f} filas/s)")
+    return reporte
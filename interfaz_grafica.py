@@ -4,12 +4,457 @@ Interfaz Gráfica para Sistema de Inventario Textil
 Usa Tkinter (incluido en Python)
 """
 
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
+from concurrent.futures import ThreadPoolExecutor
 from inventario import Inventario
+from base_datos import COLUMNAS_ORDEN
 from datetime import datetime
 
+class TrabajadorFondo:
+    """Ejecuta el trabajo de base de datos fuera del hilo de Tk
+
+    Las tareas corren de a una y en orden en un hilo aparte. Tk no debe usarse desde
+    otros hilos, así que los resultados se recogen de una cola con root.after y los
+    callbacks se llaman en el hilo de Tk. al_cambiar(ocupado) avisa cuando empieza y
+    cuando termina el trabajo pendiente (para mostrar un indicador). interrumpir(hilo)
+    detiene la consulta que está corriendo en ese hilo (BaseDatos.interrumpir_lectura).
+    """
+
+    INTERVALO_MS = 50
+
+    def __init__(self, root, al_cambiar=None, interrumpir=None):
+        self.root = root
+        self.al_cambiar = al_cambiar
+        self.interrumpir = interrumpir
+        self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="interfaz-bd")
+        self._terminadas = queue.Queue()
+        self._pendientes = {}
+        self._en_curso = {}
+        self._indicadas = set()
+        self._revisando = False
+
+    def ejecutar(self, funcion, *args, al_terminar=None, al_fallar=None, al_cancelar=None, cancelable=False,
+                 indicar=True, **kwargs):
+        """Encola funcion(*args, **kwargs) y devuelve su Future
+
+        al_terminar(resultado) o al_fallar(error) se llaman en el hilo de Tk. Una tarea
+        cancelable (solo lecturas) que cancelar() alcanza en la cola ya no se ejecuta; si
+        estaba en curso, se interrumpe su consulta y se descarta su resultado. En ambos
+        casos se llama al_cancelar(). Con indicar=False la tarea no enciende el indicador
+        de ocupado (p. ej. sondeos).
+        """
+        cancelacion = threading.Event()
+        futuro = self._ejecutor.submit(self._correr, cancelacion, funcion, args, kwargs)
+        self._pendientes[futuro] = (cancelacion if cancelable else None)
+        tarea = (futuro, cancelacion, al_terminar, al_fallar, al_cancelar)
+        futuro.add_done_callback(lambda _: self._terminadas.put(tarea))
+
+        if indicar:
+            self._indicadas.add(futuro)
+            if len(self._indicadas) == 1 and self.al_cambiar:
+                self.al_cambiar(True)
+        if not self._revisando:
+            self._revisando = True
+            self.root.after(self.INTERVALO_MS, self._revisar)
+        return futuro
+
+    def _correr(self, cancelacion, funcion, args, kwargs):
+        """(Hilo del trabajador) Ejecuta la tarea anotando en qué hilo corre, para cancelar()"""
+        self._en_curso[cancelacion] = threading.get_ident()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            del self._en_curso[cancelacion]
+
+    def _revisar(self):
+        """Entrega en el hilo de Tk los resultados de las tareas terminadas"""
+        while True:
+            try:
+                futuro, cancelacion, al_terminar, al_fallar, al_cancelar = self._terminadas.get_nowait()
+            except queue.Empty:
+                break
+            self._pendientes.pop(futuro, None)
+            if futuro in self._indicadas:
+                self._indicadas.discard(futuro)
+                if not self._indicadas and self.al_cambiar:
+                    self.al_cambiar(False)
+            if futuro.cancelled() or cancelacion.is_set():
+                if al_cancelar:
+                    al_cancelar()
+                continue
+            error = futuro.exception()
+            if error is not None:
+                (al_fallar or self._informar_error)(error)
+            elif al_terminar:
+                al_terminar(futuro.result())
+
+        if self._pendientes:
+            self.root.after(self.INTERVALO_MS, self._revisar)
+        else:
+            self._revisando = False
+
+    @staticmethod
+    def _informar_error(error):
+        """Muestra el error de una tarea que no indicó al_fallar"""
+        messagebox.showerror("Error", f"La operación falló: {error}")
+
+    def cancelar(self):
+        """Cancela las tareas cancelables (en cola o en curso); las escrituras no se cancelan"""
+        for futuro, cancelacion in list(self._pendientes.items()):
+            if cancelacion is not None:
+                cancelacion.set()
+                if not futuro.cancel():
+                    hilo = self._en_curso.get(cancelacion)
+                    if hilo is not None and self.interrumpir:
+                        self.interrumpir(hilo)
+
+    def cerrar(self):
+        """Cancela lo cancelable y espera a que termine lo que está en curso"""
+        self.cancelar()
+        self._ejecutor.shutdown(wait=True)
+
+
+class TablaIncremental:
+    """Mantiene un Treeview al día aplicando solo las diferencias por id
+
+    Cada fila se identifica por su id (iid del Treeview). Al refrescar se actualizan
+    las filas cuyo contenido cambió, se insertan las nuevas y se quitan las que ya no
+    están, en lugar de borrar e insertar toda la tabla.
+    """
+
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self.valores = {}
+        self.orden = []
+
+    def reemplazar(self, filas):
+        """Deja en la tabla exactamente filas: lista ordenada de (id, valores)"""
+        nuevas = {str(id_fila): tuple(valores) for id_fila, valores in filas}
+        sobrantes = [iid for iid in self.orden if iid not in nuevas]
+        if sobrantes:
+            self.tabla.delete(*sobrantes)
+
+        orden = [str(id_fila) for id_fila, _ in filas]
+        for indice, iid in enumerate(orden):
+            valores = nuevas[iid]
+            if iid not in self.valores:
+                self.tabla.insert('', indice, iid=iid, values=valores)
+            elif self.valores[iid] != valores:
+                self.tabla.item(iid, values=valores)
+        if [iid for iid in self.orden if iid in nuevas] != [iid for iid in orden if iid in self.valores]:
+            # Solo se reordena si cambió el orden relativo de las filas que ya estaban
+            for indice, iid in enumerate(orden):
+                self.tabla.move(iid, '', indice)
+
+        self.valores = nuevas
+        self.orden = orden
+
+    def limpiar(self):
+        """Vacía la tabla"""
+        self.reemplazar([])
+
+
+# Columna del Treeview -> campo del producto (para ordenar desde los encabezados)
+COLUMNAS_TABLA = {'ID': 'id', 'Nombre': 'nombre', 'Tela': 'tipo_tela', 'Talla': 'talla',
+                  'Color': 'color', 'Stock': 'cantidad'}
+
+
+def filas_productos(productos):
+    """(id, valores) de cada producto en el orden de columnas de las tablas"""
+    return [(p.id, (p.id, p.nombre, p.tipo_tela, p.talla, p.color, p.cantidad)) for p in productos]
+
+
+class FuenteBaseDatos:
+    """Fuente de filas para TablaVirtual: todos los productos, leídos por ventanas
+
+    Las ventanas contiguas se piden por clave (keyset) desde la primera o la última fila
+    ya cargada; los saltos largos de la barra de desplazamiento usan OFFSET.
+    """
+
+    def __init__(self, bd):
+        self.bd = bd
+
+    def contar(self):
+        """Cantidad de filas de la fuente"""
+        return self.bd.contar_productos()
+
+    def ventana(self, ordenar_por, descendente, desde, limite, ancla=None):
+        """Productos [desde, desde + limite) en el orden pedido
+
+        ancla=('despues', clave) continúa tras esa fila y ('antes', clave) trae las
+        filas inmediatamente anteriores; sin ancla se salta con desplazamiento.
+        """
+        if ancla is None:
+            return self.bd.obtener_pagina(ordenar_por, limite, desplazamiento=desde, descendente=descendente)
+        sentido, clave = ancla
+        if sentido == 'despues':
+            return self.bd.obtener_pagina(ordenar_por, limite, despues=clave, descendente=descendente)
+        anteriores = self.bd.obtener_pagina(ordenar_por, limite, despues=clave, descendente=not descendente)
+        return anteriores[::-1]
+
+    def clave(self, producto, ordenar_por):
+        """Clave (valor, id) de una fila, para pedir la ventana contigua"""
+        return self.bd.clave_pagina(producto, ordenar_por)
+
+    def aplicar_cambios(self, productos, eliminados):
+        """Los datos ya están en la base: no hay nada que actualizar"""
+
+
+class FuenteLista:
+    """Fuente de filas para TablaVirtual sobre una lista ya cargada (resultados de búsqueda)"""
+
+    def __init__(self, productos):
+        self.productos = list(productos)
+        self._orden = None
+        self._base = None
+        self._ordenados = []
+
+    def contar(self):
+        """Cantidad de filas de la fuente"""
+        return len(self.productos)
+
+    def ventana(self, ordenar_por, descendente, desde, limite, ancla=None):
+        """Productos [desde, desde + limite); la lista se ordena una vez por orden pedido"""
+        productos = self.productos
+        if self._orden != (ordenar_por, descendente) or self._base is not productos:
+            self._ordenados = sorted(productos, key=lambda p: (getattr(p, ordenar_por), p.id),
+                                     reverse=descendente)
+            self._orden, self._base = (ordenar_por, descendente), productos
+        return self._ordenados[desde:desde + limite]
+
+    def clave(self, producto, ordenar_por):
+        """Clave (valor, id) de una fila, para pedir la ventana contigua"""
+        return (getattr(producto, ordenar_por), producto.id)
+
+    def aplicar_cambios(self, productos, eliminados):
+        """Actualiza los productos de la lista que cambiaron y quita los eliminados
+
+        No agrega productos nuevos: la lista es el resultado de una búsqueda ya hecha.
+        """
+        cambiados = {p.id: p for p in productos}
+        eliminados = set(eliminados)
+        self.productos = [cambiados.get(p.id, p) for p in self.productos if p.id not in eliminados]
+
+
+class TablaVirtual:
+    """Treeview con desplazamiento virtual: solo contiene las filas visibles
+
+    Guarda en un búfer unas pocas pantallas de filas alrededor de la posición actual y
+    pide a la fuente nuevas ventanas al desplazarse. Las lecturas pasan por el
+    trabajador en segundo plano; si llegan varios desplazamientos mientras se lee, solo
+    se atiende la última posición. Al hacer clic en un encabezado se ordena en la fuente
+    (en SQL para FuenteBaseDatos), no en la tabla.
+    """
+
+    PANTALLAS_BUFER = 3
+    ALTO_FILA = 20
+
+    def __init__(self, tabla, scroll_y, trabajador, fuente, columnas, ordenar_por='nombre', al_cambiar=None):
+        self.tabla = tabla
+        self.scroll_y = scroll_y
+        self.trabajador = trabajador
+        self.fuente = fuente
+        self.columnas = columnas
+        self.ordenar_por = ordenar_por
+        self.descendente = False
+        self.al_cambiar = al_cambiar
+        self.vista = TablaIncremental(tabla)
+        self.titulos = {col: tabla.heading(col, 'text') for col in columnas}
+
+        self.visibles = 20
+        self.total = 0
+        self.posicion = 0
+        self.inicio = 0
+        self.filas = []
+        self._version = 0
+        self._cargando = False
+
+        scroll_y.config(command=self.desplazar)
+        for evento in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            tabla.bind(evento, self._rueda)
+        tabla.bind('<Configure>', self._redimensionar)
+        for col, campo in columnas.items():
+            if campo in COLUMNAS_ORDEN:
+                tabla.heading(col, command=lambda campo=campo: self.ordenar(campo))
+        self._marcar_orden()
+
+    # ---- Fuente y orden ----
+
+    def cambiar_fuente(self, fuente):
+        """Muestra otra fuente de filas desde el principio"""
+        self.fuente = fuente
+        self.posicion = 0
+        self.refrescar()
+
+    def ordenar(self, campo):
+        """Ordena por campo; un segundo clic en la misma columna invierte el sentido"""
+        if campo == self.ordenar_por:
+            self.descendente = not self.descendente
+        else:
+            self.ordenar_por, self.descendente = campo, False
+        self._marcar_orden()
+        self.posicion = 0
+        self.refrescar()
+
+    def _marcar_orden(self):
+        for col, campo in self.columnas.items():
+            flecha = (" ▼" if self.descendente else " ▲") if campo == self.ordenar_por else ""
+            self.tabla.heading(col, text=self.titulos[col] + flecha)
+
+    def refrescar(self):
+        """Descarta el búfer y vuelve a leer el total y las filas de la posición actual"""
+        self._version += 1
+        self.filas, self.inicio = [], self.posicion
+        self._cargando = False
+        version = self._version
+        self.trabajador.ejecutar(self.fuente.contar, cancelable=True,
+                                 al_terminar=lambda total: self._recibir_total(version, total))
+
+    def aplicar_cambios(self, productos, eliminados):
+        """Refleja cambios de la base (de cambios_desde) leyendo lo mínimo
+
+        Un producto del búfer cuya clave de orden no cambió se corrige en el lugar. Si una
+        fila entra, sale o se mueve dentro del tramo cargado se vuelve a leer la ventana;
+        si el cambio cae fuera del tramo, el búfer sigue siendo contiguo y solo se recuenta.
+        """
+        self.fuente.aplicar_cambios(productos, eliminados)
+        if not self.filas:
+            self.refrescar()
+            return
+        indices = {p.id: i for i, p in enumerate(self.filas)}
+        extremos = sorted((self.fuente.clave(self.filas[0], self.ordenar_por),
+                           self.fuente.clave(self.filas[-1], self.ordenar_por)))
+        releer = any(id_producto in indices for id_producto in eliminados)
+        recontar = bool(eliminados)
+        for producto in productos:
+            clave = self.fuente.clave(producto, self.ordenar_por)
+            indice = indices.get(producto.id)
+            if indice is None:
+                if extremos[0] <= clave <= extremos[1]:
+                    releer = True
+                else:
+                    recontar = True
+            elif clave == self.fuente.clave(self.filas[indice], self.ordenar_por):
+                self.filas[indice] = producto
+            else:
+                releer = True
+
+        if releer:
+            self.refrescar()
+        elif recontar:
+            version = self._version
+            self.trabajador.ejecutar(self.fuente.contar, indicar=False, cancelable=True,
+                                     al_terminar=lambda total: self._recibir_total(version, total))
+        elif self._cubierta():
+            self._mostrar()
+
+    def _recibir_total(self, version, total):
+        if version != self._version:
+            return
+        self.total = total
+        if self.al_cambiar:
+            self.al_cambiar(total)
+        self.mover(self.posicion)
+
+    # ---- Desplazamiento ----
+
+    def desplazar(self, accion, cantidad, unidad=None):
+        """Comando de la barra de desplazamiento ('moveto' o 'scroll')"""
+        if accion == 'moveto':
+            self.mover(int(float(cantidad) * self.total))
+        elif accion == 'scroll':
+            paso = self.visibles if unidad == 'pages' else 1
+            self.mover(self.posicion + int(cantidad) * paso)
+
+    def _rueda(self, evento):
+        if getattr(evento, 'num', None) == 4 or getattr(evento, 'delta', 0) > 0:
+            self.mover(self.posicion - 3)
+        else:
+            self.mover(self.posicion + 3)
+        return "break"
+
+    def _redimensionar(self, evento):
+        visibles = max(1, evento.height // self.ALTO_FILA - 1)
+        if visibles != self.visibles:
+            self.visibles = visibles
+            self.mover(self.posicion)
+
+    def mover(self, posicion):
+        """Muestra las filas desde posicion, leyendo una ventana nueva si hace falta"""
+        self.posicion = max(0, min(posicion, self.total - self.visibles))
+        if self._cubierta():
+            self._mostrar()
+            return
+        if self._cargando:
+            # Al llegar la lectura en curso se vuelve a mirar la última posición pedida
+            return
+        self._cargando = True
+        version, plan = self._version, self._planear()
+        _, desde, limite, ancla = plan
+        self.trabajador.ejecutar(self.fuente.ventana, self.ordenar_por, self.descendente, desde, limite, ancla,
+                                 cancelable=True, al_terminar=lambda filas: self._recibir(version, plan, filas),
+                                 al_cancelar=lambda: self._cancelada(version))
+
+    def _cubierta(self):
+        fin = min(self.posicion + self.visibles, self.total)
+        return self.inicio <= self.posicion and fin <= self.inicio + len(self.filas)
+
+    def _planear(self):
+        """Decide qué ventana leer: contigua por clave si el salto es corto, por OFFSET si no"""
+        bloque = self.visibles * self.PANTALLAS_BUFER
+        fin_bufer = self.inicio + len(self.filas)
+        if self.filas and fin_bufer <= self.posicion < fin_bufer + bloque - self.visibles:
+            return ('adelante', fin_bufer, bloque, ('despues', self.fuente.clave(self.filas[-1], self.ordenar_por)))
+        if self.filas and self.inicio - bloque < self.posicion < self.inicio:
+            cantidad = min(bloque, self.inicio)
+            return ('atras', self.inicio - cantidad, cantidad,
+                    ('antes', self.fuente.clave(self.filas[0], self.ordenar_por)))
+        desde = max(0, self.posicion - self.visibles)
+        return ('salto', desde, bloque, None)
+
+    def _cancelada(self, version):
+        """La lectura de la ventana se canceló: el próximo desplazamiento vuelve a pedirla"""
+        if version == self._version:
+            self._cargando = False
+
+    def _recibir(self, version, plan, filas):
+        if version != self._version:
+            return
+        self._cargando = False
+        modo, desde, limite, _ = plan
+        maximo = self.visibles * self.PANTALLAS_BUFER * 2
+        if modo == 'adelante' and filas:
+            self.filas = self.filas + filas
+            sobrante = max(0, len(self.filas) - maximo)
+            self.filas, self.inicio = self.filas[sobrante:], self.inicio + sobrante
+        elif modo == 'atras' and filas:
+            self.filas = (filas + self.filas)[:maximo]
+            self.inicio = max(0, self.inicio - len(filas))
+        else:
+            self.filas, self.inicio = filas, desde
+            if len(filas) < limite:
+                # Se llegó al final: el total pudo cambiar desde que se contó
+                self.total = desde + len(filas)
+        self.mover(self.posicion)
+
+    def _mostrar(self):
+        desde = self.posicion - self.inicio
+        visibles = self.filas[desde:desde + self.visibles]
+        self.vista.reemplazar(filas_productos(visibles))
+        if self.total:
+            self.scroll_y.set(self.posicion / self.total, (self.posicion + len(visibles)) / self.total)
+        else:
+            self.scroll_y.set(0, 1)
+
+
 class InterfazInventario:
+    # Cada cuánto se preguntan a la base los cambios hechos por otras ventanas o procesos
+    INTERVALO_CAMBIOS_MS = 2000
+    LIMITE_HISTORIAL = 100
+
     def __init__(self, root):
         self.root = root
         self.root.title("🧵 Sistema de Inventario Textil")
@@ -26,13 +471,24 @@ class InterfazInventario:
         # Inicializar inventario
         self.inventario = Inventario()
         
+        # Las consultas y escrituras corren en un hilo aparte para no congelar la ventana
+        self.trabajador = TrabajadorFondo(self.root, al_cambiar=self.indicar_ocupado,
+                                          interrumpir=self.inventario.bd.interrumpir_lectura)
+        self.consulta_busqueda = 0
+        
+        # Última versión de los datos aplicada a las vistas (ver BaseDatos.cambios_desde)
+        self.version_datos = None
+        self.revision_pendiente = False
+        self.movimientos = []
+        
         # Configurar estilo
         self.configurar_estilo()
         
         # Crear interfaz
         self.crear_interfaz()
         
-        # Cargar datos iniciales
+        # Cargar datos iniciales (la versión se lee antes, para no perder cambios intermedios)
+        self.sondear_cambios()
         self.actualizar_tabla()
     
     def configurar_estilo(self):
@@ -74,6 +530,9 @@ class InterfazInventario:
                        font=('Arial', 12, 'bold'),
                        background='white',
                        foreground=self.color_secundario)
+        
+        # Alto fijo de fila: las tablas virtuales calculan con él cuántas filas caben
+        style.configure('Treeview', rowheight=TablaVirtual.ALTO_FILA)
     
     def crear_interfaz(self):
         """Crea todos los elementos de la interfaz"""
@@ -115,9 +574,33 @@ class InterfazInventario:
                                     fg='white')
         self.label_fecha.pack(side='right', padx=20)
         
+        # Indicador de trabajo en segundo plano (visible solo mientras hay tareas)
+        self.frame_ocupado = tk.Frame(header, bg=self.color_primario)
+        tk.Label(self.frame_ocupado, text="Trabajando...", font=('Arial', 10),
+                 bg=self.color_primario, fg='white').pack(side='left', padx=5)
+        self.barra_ocupado = ttk.Progressbar(self.frame_ocupado, mode='indeterminate', length=120)
+        self.barra_ocupado.pack(side='left', padx=5)
+        ttk.Button(self.frame_ocupado, text="✖ Cancelar",
+                  command=self.cancelar_trabajo).pack(side='left', padx=5)
+        
         # Actualizar hora cada segundo
         self.actualizar_hora()
     
+    def indicar_ocupado(self, ocupado):
+        """Muestra u oculta el indicador de trabajo en segundo plano"""
+        if ocupado:
+            self.frame_ocupado.pack(side='right', padx=10)
+            self.barra_ocupado.start(15)
+            self.root.config(cursor='watch')
+        else:
+            self.barra_ocupado.stop()
+            self.frame_ocupado.pack_forget()
+            self.root.config(cursor='')
+    
+    def cancelar_trabajo(self):
+        """Cancela las lecturas pendientes (ventanas de las tablas, búsquedas, reportes)"""
+        self.trabajador.cancelar()
+    
     def actualizar_hora(self):
         """Actualiza la hora en el header"""
         self.label_fecha.config(text=datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
@@ -223,6 +706,9 @@ class InterfazInventario:
         ttk.Button(header_frame, text="🔄 Actualizar",
                   command=self.actualizar_tabla).pack(side='right', padx=10)
         
+        self.label_total = ttk.Label(header_frame, text="")
+        self.label_total.pack(side='right', padx=5)
+        
         # Frame para la tabla
         table_frame = ttk.Frame(parent)
         table_frame.pack(fill='both', expand=True, padx=10, pady=10)
@@ -238,10 +724,8 @@ class InterfazInventario:
         self.tabla_productos = ttk.Treeview(table_frame,
                                            columns=('ID', 'Nombre', 'Tela', 'Talla', 'Color', 'Stock'),
                                            show='headings',
-                                           yscrollcommand=scroll_y.set,
                                            xscrollcommand=scroll_x.set)
         
-        scroll_y.config(command=self.tabla_productos.yview)
         scroll_x.config(command=self.tabla_productos.xview)
         
         # Configurar columnas
@@ -260,6 +744,10 @@ class InterfazInventario:
         self.tabla_productos.column('Stock', width=80, anchor='center')
         
         self.tabla_productos.pack(fill='both', expand=True)
+        # Solo las filas visibles están en el Treeview; el resto se lee al desplazarse
+        self.vista_productos = TablaVirtual(self.tabla_productos, scroll_y, self.trabajador,
+                                            FuenteBaseDatos(self.inventario.bd), COLUMNAS_TABLA,
+                                            al_cambiar=lambda total: self.label_total.config(text=f"{total} productos"))
         
         # Evento de doble clic
         self.tabla_productos.bind('<Double-1>', self.cargar_producto_seleccionado)
@@ -299,6 +787,13 @@ class InterfazInventario:
         self.search_stock.grid(row=2, column=1, padx=10, pady=5)
         ttk.Button(search_form, text="Buscar", command=self.buscar_bajo_stock).grid(row=2, column=2, padx=5)
         
+        # Texto libre (nombre, color o tela)
+        ttk.Label(search_form, text="Nombre / Texto:", font=('Arial', 10)).grid(row=3, column=0, padx=10, pady=5)
+        self.search_texto = ttk.Entry(search_form, width=25)
+        self.search_texto.grid(row=3, column=1, padx=10, pady=5)
+        self.search_texto.bind('<Return>', lambda e: self.buscar_texto())
+        ttk.Button(search_form, text="Buscar", command=self.buscar_texto).grid(row=3, column=2, padx=5)
+        
         ttk.Button(panel_busqueda, text="🔄 Mostrar Todos",
                   style='Primary.TButton',
                   command=self.actualizar_tabla_busqueda).pack(pady=10)
@@ -316,10 +811,7 @@ class InterfazInventario:
         
         self.tabla_busqueda = ttk.Treeview(table_frame,
                                           columns=('ID', 'Nombre', 'Tela', 'Talla', 'Color', 'Stock'),
-                                          show='headings',
-                                          yscrollcommand=scroll_y.set)
-        
-        scroll_y.config(command=self.tabla_busqueda.yview)
+                                          show='headings')
         
         for col in ('ID', 'Nombre', 'Tela', 'Talla', 'Color', 'Stock'):
             self.tabla_busqueda.heading(col, text=col)
@@ -332,6 +824,8 @@ class InterfazInventario:
         self.tabla_busqueda.column('Stock', width=100, anchor='center')
         
         self.tabla_busqueda.pack(fill='both', expand=True)
+        self.vista_busqueda = TablaVirtual(self.tabla_busqueda, scroll_y, self.trabajador,
+                                           FuenteLista([]), COLUMNAS_TABLA)
     
     # ==================== PESTAÑA: ESTADÍSTICAS ====================
     
@@ -437,6 +931,7 @@ class InterfazInventario:
         self.tabla_historial.column('Fecha', width=180)
         
         self.tabla_historial.pack(fill='both', expand=True)
+        self.vista_historial = TablaIncremental(self.tabla_historial)
         
         # Cargar historial inicial
         self.actualizar_historial()
@@ -460,60 +955,63 @@ class InterfazInventario:
             messagebox.showwarning("Campos vacíos", "Por favor complete todos los campos obligatorios")
             return
         
-        if self.inventario.agregar_producto(nombre, tela, talla, cantidad, color):
-            messagebox.showinfo("Éxito", "Producto agregado correctamente")
-            self.limpiar_formulario()
-            self.actualizar_tabla()
-            self.actualizar_estadisticas()
-        else:
-            messagebox.showerror("Error", "No se pudo agregar el producto")
+        def al_terminar(agregado):
+            if agregado:
+                messagebox.showinfo("Éxito", "Producto agregado correctamente")
+                self.limpiar_formulario()
+                self.revisar_cambios()
+            else:
+                messagebox.showerror("Error", "No se pudo agregar el producto")
+        
+        self.trabajador.ejecutar(self.inventario.agregar_producto, nombre, tela, talla, cantidad, color,
+                                 al_terminar=al_terminar)
     
     def aumentar_stock(self):
         """Aumenta el stock de un producto"""
-        try:
-            id_producto = int(self.entry_id_stock.get())
-            cantidad = int(self.entry_cantidad_stock.get())
-            
-            if self.inventario.aumentar_stock(id_producto, cantidad):
-                messagebox.showinfo("Éxito", "Stock aumentado correctamente")
-                self.actualizar_tabla()
-                self.actualizar_estadisticas()
-                self.entry_id_stock.delete(0, tk.END)
-                self.entry_cantidad_stock.delete(0, tk.END)
-        except ValueError:
-            messagebox.showerror("Error", "ID y cantidad deben ser números enteros")
+        self._cambiar_stock(self.inventario.aumentar_stock, "Stock aumentado correctamente")
     
     def reducir_stock(self):
         """Reduce el stock de un producto"""
+        self._cambiar_stock(self.inventario.reducir_stock, "Stock reducido correctamente")
+    
+    def _cambiar_stock(self, operacion, mensaje):
+        """Aplica operacion(id, cantidad) en segundo plano con los datos del formulario"""
         try:
             id_producto = int(self.entry_id_stock.get())
             cantidad = int(self.entry_cantidad_stock.get())
-            
-            if self.inventario.reducir_stock(id_producto, cantidad):
-                messagebox.showinfo("Éxito", "Stock reducido correctamente")
-                self.actualizar_tabla()
-                self.actualizar_estadisticas()
-                self.entry_id_stock.delete(0, tk.END)
-                self.entry_cantidad_stock.delete(0, tk.END)
         except ValueError:
             messagebox.showerror("Error", "ID y cantidad deben ser números enteros")
+            return
+        
+        def al_terminar(aplicado):
+            if aplicado:
+                messagebox.showinfo("Éxito", mensaje)
+                self.revisar_cambios()
+                self.entry_id_stock.delete(0, tk.END)
+                self.entry_cantidad_stock.delete(0, tk.END)
+        
+        self.trabajador.ejecutar(operacion, id_producto, cantidad, al_terminar=al_terminar)
     
     def eliminar_producto(self):
         """Elimina un producto"""
         try:
             id_producto = int(self.entry_id_stock.get())
-            
-            respuesta = messagebox.askyesno("Confirmar", 
-                                           f"¿Está seguro de eliminar el producto ID {id_producto}?")
-            
-            if respuesta:
-                if self.inventario.eliminar_producto(id_producto):
-                    messagebox.showinfo("Éxito", "Producto eliminado correctamente")
-                    self.actualizar_tabla()
-                    self.actualizar_estadisticas()
-                    self.entry_id_stock.delete(0, tk.END)
         except ValueError:
             messagebox.showerror("Error", "El ID debe ser un número entero")
+            return
+        
+        respuesta = messagebox.askyesno("Confirmar", 
+                                       f"¿Está seguro de eliminar el producto ID {id_producto}?")
+        if not respuesta:
+            return
+        
+        def al_terminar(eliminado):
+            if eliminado:
+                messagebox.showinfo("Éxito", "Producto eliminado correctamente")
+                self.revisar_cambios()
+                self.entry_id_stock.delete(0, tk.END)
+        
+        self.trabajador.ejecutar(self.inventario.eliminar_producto, id_producto, al_terminar=al_terminar)
     
     def limpiar_formulario(self):
         """Limpia todos los campos del formulario"""
@@ -538,31 +1036,85 @@ class InterfazInventario:
     # ==================== FUNCIONES DE TABLA ====================
     
     def actualizar_tabla(self):
-        """Actualiza la tabla de productos"""
-        # Limpiar tabla
-        for item in self.tabla_productos.get_children():
-            self.tabla_productos.delete(item)
+        """Vuelve a leer el total y las filas visibles de la tabla de productos"""
+        self.vista_productos.refrescar()
+    
+    def refrescar_vistas(self):
+        """Vuelve a leer todas las vistas (en las tablas, solo las filas visibles)"""
+        self.actualizar_tabla()
+        if isinstance(self.vista_busqueda.fuente, FuenteBaseDatos):
+            self.vista_busqueda.refrescar()
+        self.actualizar_historial()
+        self.actualizar_estadisticas()
+    
+    def sondear_cambios(self):
+        """Revisa periódicamente si los datos cambiaron"""
+        self.revisar_cambios()
+        self.root.after(self.INTERVALO_CAMBIOS_MS, self.sondear_cambios)
+    
+    def revisar_cambios(self):
+        """Pide los cambios desde la última versión aplicada (sin encender el indicador)"""
+        if self.revision_pendiente:
+            return
+        self.revision_pendiente = True
+        self.trabajador.ejecutar(self.inventario.bd.cambios_desde, self.version_datos, indicar=False,
+                                 al_terminar=self.aplicar_cambios, al_fallar=lambda e: self.aplicar_cambios(None))
+    
+    def aplicar_cambios(self, cambios):
+        """Lleva a las vistas solo lo que cambió; si no hubo cambios no se lee nada más"""
+        self.revision_pendiente = False
+        if cambios is None:
+            return
+        primera = self.version_datos is None
+        self.version_datos = cambios['version']
+        if primera:
+            return
+        if cambios['completo']:
+            self.refrescar_vistas()
+            return
         
-        # Obtener productos
-        productos = self.inventario.bd.obtener_todos(ordenar_por='nombre')
+        productos, eliminados = cambios['productos'], cambios['productos_eliminados']
+        if productos or eliminados:
+            self.vista_productos.aplicar_cambios(productos, eliminados)
+            self.vista_busqueda.aplicar_cambios(productos, eliminados)
+            self.actualizar_estadisticas()
         
-        # Llenar tabla
-        for p in productos:
-            self.tabla_productos.insert('', 'end', values=(
-                p.id, p.nombre, p.tipo_tela, p.talla, p.color, p.cantidad
-            ))
+        movimientos_eliminados = set(cambios['movimientos_eliminados'])
+        if any(mov['id'] in movimientos_eliminados for mov in self.movimientos):
+            # Faltarían filas al final de la tabla: se vuelve a leer
+            self.actualizar_historial()
+        elif cambios['movimientos']:
+            nuevos = {mov['id'] for mov in cambios['movimientos']}
+            movimientos = cambios['movimientos'] + [mov for mov in self.movimientos if mov['id'] not in nuevos]
+            movimientos.sort(key=lambda mov: (mov['fecha'], mov['id']), reverse=True)
+            self._mostrar_historial(movimientos[:self.LIMITE_HISTORIAL])
     
     def actualizar_tabla_busqueda(self):
-        """Actualiza la tabla de búsqueda con todos los productos"""
-        for item in self.tabla_busqueda.get_children():
-            self.tabla_busqueda.delete(item)
-        
-        productos = self.inventario.bd.obtener_todos()
-        
-        for p in productos:
-            self.tabla_busqueda.insert('', 'end', values=(
-                p.id, p.nombre, p.tipo_tela, p.talla, p.color, p.cantidad
-            ))
+        """Muestra todos los productos en la tabla de búsqueda, leídos por ventanas al desplazarse"""
+        self._nueva_consulta_busqueda()
+        self.vista_busqueda.cambiar_fuente(FuenteBaseDatos(self.inventario.bd))
+    
+    def _nueva_consulta_busqueda(self):
+        """Numera las consultas de la tabla de búsqueda: solo se muestra la última pedida"""
+        self.consulta_busqueda += 1
+        return self.consulta_busqueda
+    
+    def buscar_en_segundo_plano(self, funcion, *args, al_mostrar=None):
+        """Ejecuta una búsqueda fuera del hilo de Tk y muestra sus resultados en la tabla"""
+        consulta = self._nueva_consulta_busqueda()
+        
+        def al_terminar(resultados):
+            if consulta != self.consulta_busqueda:
+                return
+            self.mostrar_resultados(resultados)
+            if al_mostrar:
+                al_mostrar(resultados)
+        
+        self.trabajador.ejecutar(funcion, *args, cancelable=True, al_terminar=al_terminar)
+    
+    def mostrar_resultados(self, productos):
+        """Reemplaza el contenido de la tabla de búsqueda por los resultados"""
+        self.vista_busqueda.cambiar_fuente(FuenteLista(productos))
     
     # ==================== FUNCIONES DE BÚSQUEDA ====================
     
@@ -573,19 +1125,13 @@ class InterfazInventario:
             messagebox.showwarning("Campo vacío", "Ingrese un tipo de tela")
             return
         
-        for item in self.tabla_busqueda.get_children():
-            self.tabla_busqueda.delete(item)
-        
-        resultados = self.inventario.bd.buscar_por_tela(tela)
+        def al_mostrar(resultados):
+            if resultados:
+                messagebox.showinfo("Búsqueda", f"Se encontraron {len(resultados)} productos")
+            else:
+                messagebox.showinfo("Sin resultados", f"No se encontraron productos con tela '{tela}'")
         
-        if resultados:
-            for p in resultados:
-                self.tabla_busqueda.insert('', 'end', values=(
-                    p.id, p.nombre, p.tipo_tela, p.talla, p.color, p.cantidad
-                ))
-            messagebox.showinfo("Búsqueda", f"Se encontraron {len(resultados)} productos")
-        else:
-            messagebox.showinfo("Sin resultados", f"No se encontraron productos con tela '{tela}'")
+        self.buscar_en_segundo_plano(self.inventario.bd.buscar_por_tela, tela, al_mostrar=al_mostrar)
     
     def buscar_por_talla(self):
         """Busca productos por talla"""
@@ -594,19 +1140,26 @@ class InterfazInventario:
             messagebox.showwarning("Campo vacío", "Ingrese una talla")
             return
         
-        for item in self.tabla_busqueda.get_children():
-            self.tabla_busqueda.delete(item)
+        def al_mostrar(resultados):
+            if resultados:
+                messagebox.showinfo("Búsqueda", f"Se encontraron {len(resultados)} productos")
+            else:
+                messagebox.showinfo("Sin resultados", f"No se encontraron productos talla '{talla}'")
+        
+        self.buscar_en_segundo_plano(self.inventario.bd.buscar_por_talla, talla, al_mostrar=al_mostrar)
+    
+    def buscar_texto(self):
+        """Busca productos por nombre, color o tela (coincidencia por prefijo)"""
+        texto = self.search_texto.get().strip()
+        if not texto:
+            messagebox.showwarning("Campo vacío", "Ingrese un texto a buscar")
+            return
         
-        resultados = self.inventario.bd.buscar_por_talla(talla)
+        def al_mostrar(resultados):
+            if not resultados:
+                messagebox.showinfo("Sin resultados", f"No se encontraron productos para '{texto}'")
         
-        if resultados:
-            for p in resultados:
-                self.tabla_busqueda.insert('', 'end', values=(
-                    p.id, p.nombre, p.tipo_tela, p.talla, p.color, p.cantidad
-                ))
-            messagebox.showinfo("Búsqueda", f"Se encontraron {len(resultados)} productos")
-        else:
-            messagebox.showinfo("Sin resultados", f"No se encontraron productos talla '{talla}'")
+        self.buscar_en_segundo_plano(self.inventario.bd.buscar_texto, texto, 200, al_mostrar=al_mostrar)
     
     def buscar_bajo_stock(self):
         """Busca productos con stock bajo"""
@@ -616,26 +1169,23 @@ class InterfazInventario:
             messagebox.showerror("Error", "El stock debe ser un número entero")
             return
         
-        for item in self.tabla_busqueda.get_children():
-            self.tabla_busqueda.delete(item)
+        def al_mostrar(resultados):
+            if resultados:
+                messagebox.showwarning("Alerta", f"¡{len(resultados)} productos con stock bajo!")
+            else:
+                messagebox.showinfo("Stock OK", f"Todos los productos tienen stock > {stock}")
         
-        resultados = self.inventario.bd.productos_bajo_stock(stock)
-        
-        if resultados:
-            for p in resultados:
-                self.tabla_busqueda.insert('', 'end', values=(
-                    p.id, p.nombre, p.tipo_tela, p.talla, p.color, p.cantidad
-                ))
-            messagebox.showwarning("Alerta", f"¡{len(resultados)} productos con stock bajo!")
-        else:
-            messagebox.showinfo("Stock OK", f"Todos los productos tienen stock > {stock}")
+        self.buscar_en_segundo_plano(self.inventario.bd.productos_bajo_stock, stock, al_mostrar=al_mostrar)
     
     # ==================== FUNCIONES DE ESTADÍSTICAS ====================
     
     def actualizar_estadisticas(self):
         """Actualiza las estadísticas generales"""
-        stats = self.inventario.bd.estadisticas_generales()
-        
+        self.trabajador.ejecutar(self.inventario.bd.estadisticas_generales, cancelable=True,
+                                 al_terminar=self._mostrar_estadisticas)
+    
+    def _mostrar_estadisticas(self, stats):
+        """Escribe las estadísticas leídas en las tarjetas"""
         self.stat_labels["Total Productos"].config(text=str(stats.get('total_productos', 0)))
         self.stat_labels["Total Unidades"].config(text=str(stats.get('total_unidades', 0)))
         self.stat_labels["Tipos de Tela"].config(text=str(stats.get('tipos_tela', 0)))
@@ -643,10 +1193,13 @@ class InterfazInventario:
     
     def mostrar_resumen_telas(self):
         """Muestra resumen por tipo de tela"""
+        self.trabajador.ejecutar(self.inventario.bd.resumen_por_tela, cancelable=True,
+                                 al_terminar=self._escribir_resumen_telas)
+    
+    def _escribir_resumen_telas(self, resumen):
+        """Escribe el resumen por tipo de tela en el área de reportes"""
         self.text_reportes.delete('1.0', tk.END)
         
-        resumen = self.inventario.bd.resumen_por_tela()
-        
         texto = "="*60 + "\n"
         texto += "  RESUMEN POR TIPO DE TELA\n"
         texto += "="*60 + "\n\n"
@@ -669,10 +1222,13 @@ class InterfazInventario:
     
     def mostrar_resumen_tallas(self):
         """Muestra resumen por talla"""
+        self.trabajador.ejecutar(self.inventario.bd.resumen_por_talla, cancelable=True,
+                                 al_terminar=self._escribir_resumen_tallas)
+    
+    def _escribir_resumen_tallas(self, resumen):
+        """Escribe el resumen por talla en el área de reportes"""
         self.text_reportes.delete('1.0', tk.END)
         
-        resumen = self.inventario.bd.resumen_por_talla()
-        
         texto = "="*60 + "\n"
         texto += "  RESUMEN POR TALLA\n"
         texto += "="*60 + "\n\n"
@@ -696,24 +1252,22 @@ class InterfazInventario:
     # ==================== FUNCIONES DE HISTORIAL ====================
     
     def actualizar_historial(self):
-        """Actualiza la tabla de historial"""
-        for item in self.tabla_historial.get_children():
-            self.tabla_historial.delete(item)
-        
-        historial = self.inventario.bd.obtener_historial(limite=100)
-        
-        for mov in historial:
-            self.tabla_historial.insert('', 'end', values=(
-                mov['id'],
-                mov['nombre'],
-                mov['tipo_movimiento'],
-                f"{mov['cantidad']:+d}",
-                mov['fecha']
-            ))
+        """Actualiza la tabla de historial (solo entran los movimientos nuevos)"""
+        self.trabajador.ejecutar(self.inventario.bd.obtener_historial, limite=self.LIMITE_HISTORIAL,
+                                 cancelable=True, al_terminar=self._mostrar_historial)
+    
+    def _mostrar_historial(self, historial):
+        """Muestra en la tabla los movimientos leídos"""
+        self.movimientos = historial
+        self.vista_historial.reemplazar([
+            (mov['id'], (mov['id'], mov['nombre'], mov['tipo_movimiento'], f"{mov['cantidad']:+d}", mov['fecha']))
+            for mov in historial
+        ])
     
     def cerrar_aplicacion(self):
         """Cierra la aplicación correctamente"""
         if messagebox.askokcancel("Salir", "¿Desea cerrar la aplicación?"):
+            self.trabajador.cerrar()
             self.inventario.cerrar()
             self.root.destroy()
 
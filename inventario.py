@@ -2,11 +2,12 @@
 """Clase Inventario que integra la base de datos"""
 
 from base_datos import BaseDatos
+from importador import importar_productos
 
 class Inventario:
-    def __init__(self, ruta_db="datos/inventario.db"):
+    def __init__(self, ruta_db="datos/inventario.db", perfil=None):
         """Inicializa el inventario con conexión a base de datos"""
-        self.bd = BaseDatos(ruta_db)
+        self.bd = BaseDatos(ruta_db, perfil=perfil)
     
     def agregar_producto(self, nombre, tipo_tela, talla, cantidad, color="N/A"):
         """Agrega un nuevo producto"""
@@ -20,6 +21,13 @@ class Inventario:
         
         return self.bd.agregar_producto(nombre, tipo_tela, talla, cantidad, color)
     
+    def importar_archivo(self, origen, tamano_lote=5000, progreso=None):
+        """Importa productos desde un CSV o Excel"""
+        reporte = importar_productos(self.bd, origen, tamano_lote, progreso=progreso)
+        for linea, motivo in reporte['rechazadas'][:20]:
+            print(f"  Fila {linea}: {motivo}")
+        return reporte
+    
     def listar_todo(self, ordenar_por="nombre"):
         """Lista todos los productos"""
         productos = self.bd.obtener_todos(ordenar_por)
@@ -72,6 +80,29 @@ class Inventario:
         self._mostrar_resultados(resultados)
         return resultados
     
+    def buscar_texto(self, texto, limite=50):
+        """Busca productos por nombre, color o tela"""
+        resultados = self.bd.buscar_texto(texto, limite)
+        
+        if not resultados:
+            print(f"  No se encontraron productos para '{texto}'")
+            return []
+        
+        print(f"\n Resultados para '{texto}':")
+        self._mostrar_resultados(resultados)
+        return resultados
+    
+    def ajustar_stock(self, producto_id, delta, tipo_movimiento="AJUSTE"):
+        """Ajusta el stock de forma atómica y devuelve la nueva cantidad"""
+        return self.bd.ajustar_stock(producto_id, delta, tipo_movimiento)
+    
+    def aplicar_movimientos(self, movimientos, todo_o_nada=True):
+        """Aplica un lote de entradas/salidas en una sola transacción"""
+        reporte = self.bd.aplicar_movimientos(movimientos, todo_o_nada)
+        for indice, producto_id, motivo in reporte['rechazados']:
+            print(f"  Movimiento {indice + 1} (ID {producto_id}): {motivo}")
+        return reporte
+    
     def aumentar_stock(self, producto_id, cantidad):
         """Aumenta el stock"""
         return self.bd.aumentar_stock(producto_id, cantidad)
@@ -145,6 +176,10 @@ class Inventario:
                   f"{mov['cantidad']:+8} | {mov['fecha']}")
         print("="*90)
     
+    def archivar_historial(self, antes_de):
+        """Archiva los movimientos anteriores a una fecha"""
+        return self.bd.archivar_historial(antes_de)
+    
     def _mostrar_resultados(self, productos):
         """Muestra lista de productos"""
         print(f"{'ID':3} | {'NOMBRE':20} | {'TELA':12} | {'TALLA':5} | {'COLOR':10} | {'STOCK':5}")
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Acceso asíncrono (asyncio) a la base de datos y al inventario
+
+BaseDatosAsync e InventarioAsync exponen los mismos métodos que BaseDatos e Inventario,
+pero como corrutinas: el trabajo con SQLite corre en un único hilo dedicado que atiende
+una cola de pedidos, así el bucle de eventos nunca se bloquea. Las lecturas idénticas
+que se piden mientras otra igual espera en la cola se fusionan en una sola consulta.
+
+    async with BaseDatosAsync("datos/inventario.db") as bd:
+        productos = await bd.buscar_combinado(tipo_tela="algodon")
+        await bd.ajustar_stock(productos[0].id, -1, "SALIDA")
+"""
+
+import asyncio
+import copy
+import functools
+import queue
+import threading
+from concurrent.futures import Future
+from base_datos import BaseDatos
+from inventario import Inventario
+
+
+def _delegado(clase, nombre, lectura=False):
+    """Corrutina que ejecuta clase.nombre en el hilo de la base de datos
+
+    Con lectura=True las llamadas idénticas concurrentes comparten una sola ejecución;
+    las demás se consideran escrituras y se ejecutan siempre, en orden de llegada.
+    """
+    original = getattr(clase, nombre)
+
+    @functools.wraps(original)
+    async def metodo(self, *args, **kwargs):
+        return await self._hilo_bd.llamar(getattr(self._sincrono, nombre), *args, lectura=lectura, **kwargs)
+    return metodo
+
+
+class BaseDatosAsync:
+    """BaseDatos con métodos asíncronos, atendidos por un hilo dedicado
+
+    Los pedidos se ejecutan de a uno y en el orden en que se hicieron: una lectura pedida
+    después de una escritura ve sus cambios. Una lectura solo se fusiona con otra igual
+    (mismo método y argumentos) pedida después de la última escritura; cada corrutina
+    recibe su propia copia del resultado, como con la caché de BaseDatos.
+    """
+
+    def __init__(self, ruta_db="datos/inventario.db", bd=None, **opciones):
+        """Abre la base (o usa bd, una BaseDatos ya abierta) e inicia el hilo que la atiende
+
+        Una bd recibida sigue siendo de quien la pasó: cerrar() no la cierra.
+        """
+        self._propia = bd is None
+        self.bd = BaseDatos(ruta_db, **opciones) if self._propia else bd
+        self._hilo_bd = self
+        self._sincrono = self.bd
+        self._cola = queue.SimpleQueue()
+        self._lecturas = {}
+        self._escrituras = 0
+        self._contadores = {'lecturas': 0, 'lecturas_fusionadas': 0, 'escrituras': 0}
+        self._cerrada = False
+        self._hilo = threading.Thread(target=self._atender, name="bd-async", daemon=True)
+        self._hilo.start()
+
+    def _atender(self):
+        """(Hilo dedicado) Ejecuta los pedidos de la cola hasta recibir None"""
+        while True:
+            pedido = self._cola.get()
+            if pedido is None:
+                break
+            futuro, funcion, args, kwargs = pedido
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                futuro.set_result(funcion(*args, **kwargs))
+            except BaseException as e:
+                futuro.set_exception(e)
+
+    def _encolar(self, funcion, args, kwargs):
+        """Agrega un pedido a la cola y devuelve su futuro de asyncio"""
+        if self._cerrada:
+            raise RuntimeError("La base de datos asíncrona está cerrada")
+        futuro = Future()
+        self._cola.put((futuro, funcion, args, kwargs))
+        return asyncio.wrap_future(futuro)
+
+    async def llamar(self, funcion, *args, lectura=False, **kwargs):
+        """Ejecuta funcion(*args, **kwargs) en el hilo de la base de datos y espera el resultado"""
+        if not lectura:
+            self._escrituras += 1
+            self._contadores['escrituras'] += 1
+            return await self._encolar(funcion, args, kwargs)
+
+        self._contadores['lecturas'] += 1
+        try:
+            clave = (asyncio.get_running_loop(), self._escrituras, funcion.__qualname__, args,
+                     tuple(sorted(kwargs.items())))
+            futuro = self._lecturas.get(clave)
+        except TypeError:
+            # Argumentos no hashables (p. ej. listas): la lectura no se fusiona
+            clave, futuro = None, None
+
+        if futuro is not None:
+            self._contadores['lecturas_fusionadas'] += 1
+        else:
+            futuro = self._encolar(funcion, args, kwargs)
+            if clave is not None:
+                self._lecturas[clave] = futuro
+                futuro.add_done_callback(lambda _: self._lecturas.pop(clave, None))
+        # shield: si una corrutina se cancela, las demás que esperan la misma lectura siguen
+        return copy.copy(await asyncio.shield(futuro))
+
+    def metricas(self):
+        """Lecturas pedidas, cuántas se fusionaron con otra en curso, escrituras y pedidos en cola"""
+        return dict(self._contadores, pendientes=self._cola.qsize())
+
+    # ---- Lecturas ----
+    obtener_todos = _delegado(BaseDatos, 'obtener_todos', lectura=True)
+    obtener_pagina = _delegado(BaseDatos, 'obtener_pagina', lectura=True)
+    contar_productos = _delegado(BaseDatos, 'contar_productos', lectura=True)
+    buscar_por_id = _delegado(BaseDatos, 'buscar_por_id', lectura=True)
+    buscar_por_tela = _delegado(BaseDatos, 'buscar_por_tela', lectura=True)
+    buscar_por_talla = _delegado(BaseDatos, 'buscar_por_talla', lectura=True)
+    buscar_combinado = _delegado(BaseDatos, 'buscar_combinado', lectura=True)
+    buscar_texto = _delegado(BaseDatos, 'buscar_texto', lectura=True)
+    productos_bajo_stock = _delegado(BaseDatos, 'productos_bajo_stock', lectura=True)
+    resumen_por_tela = _delegado(BaseDatos, 'resumen_por_tela', lectura=True)
+    resumen_por_talla = _delegado(BaseDatos, 'resumen_por_talla', lectura=True)
+    estadisticas_generales = _delegado(BaseDatos, 'estadisticas_generales', lectura=True)
+    obtener_historial = _delegado(BaseDatos, 'obtener_historial', lectura=True)
+    obtener_rollup = _delegado(BaseDatos, 'obtener_rollup', lectura=True)
+    version_datos = _delegado(BaseDatos, 'version_datos', lectura=True)
+    cambios_desde = _delegado(BaseDatos, 'cambios_desde', lectura=True)
+    productos_df = _delegado(BaseDatos, 'productos_df', lectura=True)
+    historial_df = _delegado(BaseDatos, 'historial_df', lectura=True)
+    resumen_df = _delegado(BaseDatos, 'resumen_df', lectura=True)
+
+    # ---- Escrituras y mantenimiento ----
+    agregar_producto = _delegado(BaseDatos, 'agregar_producto')
+    insertar_productos_lote = _delegado(BaseDatos, 'insertar_productos_lote')
+    actualizar_stock = _delegado(BaseDatos, 'actualizar_stock')
+    ajustar_stock = _delegado(BaseDatos, 'ajustar_stock')
+    aplicar_movimientos = _delegado(BaseDatos, 'aplicar_movimientos')
+    aumentar_stock = _delegado(BaseDatos, 'aumentar_stock')
+    reducir_stock = _delegado(BaseDatos, 'reducir_stock')
+    eliminar_producto = _delegado(BaseDatos, 'eliminar_producto')
+    archivar_historial = _delegado(BaseDatos, 'archivar_historial')
+    reconstruir_resumen = _delegado(BaseDatos, 'reconstruir_resumen')
+    podar_cambios = _delegado(BaseDatos, 'podar_cambios')
+    crear_respaldo = _delegado(BaseDatos, 'crear_respaldo')
+    rotar_respaldos = _delegado(BaseDatos, 'rotar_respaldos')
+
+    # Sin acceso a la base: se usan directamente
+    clave_pagina = staticmethod(BaseDatos.clave_pagina)
+    clave_historial = staticmethod(BaseDatos.clave_historial)
+
+    async def iterar_productos(self, ordenar_por="id", tamano_bloque=2000,
+                               columnas=("id", "nombre", "tipo_tela", "talla", "color", "cantidad")):
+        """Genera (async for) los productos por bloques de tuplas, leyendo cada bloque en el hilo"""
+        bloques = self.bd.iterar_productos(ordenar_por, tamano_bloque, columnas)
+        while True:
+            bloque = await self._encolar(next, (bloques, None), {})
+            if bloque is None:
+                return
+            yield bloque
+
+    async def cerrar(self):
+        """Espera los pedidos en cola, cierra la base (si la abrió este objeto) y detiene el hilo"""
+        if self._cerrada:
+            return
+        futuro = self._encolar(self.bd.cerrar if self._propia else (lambda: None), (), {})
+        self._cerrada = True
+        await futuro
+        self._cola.put(None)
+        self._hilo.join()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *excepcion):
+        await self.cerrar()
+
+
+class InventarioAsync:
+    """Inventario con métodos asíncronos; comparte el hilo y la cola de su BaseDatosAsync (bd)"""
+
+    def __init__(self, ruta_db="datos/inventario.db", perfil=None):
+        """Inicializa el inventario y el hilo que atiende su base de datos"""
+        self.inventario = Inventario(ruta_db, perfil=perfil)
+        self.bd = BaseDatosAsync(bd=self.inventario.bd)
+        self._hilo_bd = self.bd
+        self._sincrono = self.inventario
+
+    buscar_por_tela = _delegado(Inventario, 'buscar_por_tela', lectura=True)
+    buscar_por_talla = _delegado(Inventario, 'buscar_por_talla', lectura=True)
+    buscar_combinado = _delegado(Inventario, 'buscar_combinado', lectura=True)
+    buscar_texto = _delegado(Inventario, 'buscar_texto', lectura=True)
+    productos_bajo_stock = _delegado(Inventario, 'productos_bajo_stock', lectura=True)
+
+    agregar_producto = _delegado(Inventario, 'agregar_producto')
+    importar_archivo = _delegado(Inventario, 'importar_archivo')
+    ajustar_stock = _delegado(Inventario, 'ajustar_stock')
+    aplicar_movimientos = _delegado(Inventario, 'aplicar_movimientos')
+    aumentar_stock = _delegado(Inventario, 'aumentar_stock')
+    reducir_stock = _delegado(Inventario, 'reducir_stock')
+    eliminar_producto = _delegado(Inventario, 'eliminar_producto')
+    archivar_historial = _delegado(Inventario, 'archivar_historial')
+
+    # Salida por consola: se ejecutan en orden, sin fusionarse
+    listar_todo = _delegado(Inventario, 'listar_todo')
+    mostrar_estadisticas = _delegado(Inventario, 'mostrar_estadisticas')
+    mostrar_resumen_telas = _delegado(Inventario, 'mostrar_resumen_telas')
+    mostrar_resumen_tallas = _delegado(Inventario, 'mostrar_resumen_tallas')
+    mostrar_historial = _delegado(Inventario, 'mostrar_historial')
+
+    async def cerrar(self):
+        """Detiene el hilo de la base de datos y cierra el inventario"""
+        await self.bd.cerrar()
+        self.inventario.cerrar()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *excepcion):
+        await self.cerrar()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Programa principal con menú interactivo"""
 
+import sys
 from inventario import Inventario
 
 def mostrar_menu():
@@ -21,13 +22,32 @@ def mostrar_menu():
     print("12. Ver resumen por tallas")
     print("13. Ver historial de movimientos")
     print("14. Crear respaldo de BD")
+    print("15. Importar productos (CSV/Excel)")
     print("0.  Salir")
     print("="*50)
 
+def importar(inventario, ruta):
+    """Importa un catálogo mostrando el avance por lote"""
+    try:
+        reporte = inventario.importar_archivo(
+            ruta, progreso=lambda ok, mal: print(f"   ... {ok} importados, {mal} rechazados")
+        )
+    except (OSError, RuntimeError) as e:
+        print(f" No se pudo importar: {e}")
+        return
+    print(f" {reporte['insertadas']} productos en {reporte['segundos']:.1f} s "
+          f"({reporte['filas_por_segundo']:.0f} filas/s)")
+
 def main():
     print(" Iniciando sistema...")
     inventario = Inventario()
     
+    # Uso no interactivo: python main.py --importar catalogo.csv
+    if len(sys.argv) >= 3 and sys.argv[1] == "--importar":
+        importar(inventario, sys.argv[2])
+        inventario.cerrar()
+        return
+    
     while True:
         mostrar_menu()
         opcion = input("Seleccione una opción: ").strip()
@@ -131,7 +151,21 @@ def main():
         
         elif opcion == "14":
             print("\n CREAR RESPALDO")
-            inventario.bd.crear_respaldo()
+            comprimir = input("¿Comprimir el respaldo? (s/n, Enter = no): ").strip().lower() == 's'
+            if input("¿Crearlo en segundo plano? (s/n, Enter = no): ").strip().lower() == 's':
+                futuro = inventario.bd.respaldo_en_segundo_plano(comprimir=comprimir)
+                futuro.add_done_callback(
+                    lambda f: print(f"\n Respaldo en segundo plano terminado: {f.result() or 'con errores'}")
+                )
+                print(" Respaldo iniciado; puedes seguir usando el sistema")
+            else:
+                inventario.bd.crear_respaldo(comprimir=comprimir)
+        
+        elif opcion == "15":
+            print("\n IMPORTAR PRODUCTOS")
+            ruta = input("Ruta del archivo (.csv / .xlsx): ").strip()
+            if ruta:
+                importar(inventario, ruta)
         
         elif opcion == "0":
             print("\n Cerrando sistema...")
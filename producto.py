@@ -1,29 +1,28 @@
 # -*- coding: utf-8 -*-
 """Clase que representa un producto textil"""
 
-class Producto:
-    def __init__(self, id, nombre, tipo_tela, talla, cantidad, color="N/A"):
-        self.id = id
-        self.nombre = nombre
-        self.tipo_tela = tipo_tela
-        self.talla = talla
-        self.cantidad = cantidad
-        self.color = color
+from collections import namedtuple
+
+# Orden de los campos: coincide con las columnas que BaseDatos lee de la tabla productos
+CAMPOS_PRODUCTO = ('id', 'nombre', 'tipo_tela', 'talla', 'cantidad', 'color')
+
+
+class Producto(namedtuple('Producto', CAMPOS_PRODUCTO, defaults=("N/A",))):
+    """Producto inmutable: una tupla con nombres, sin __dict__ por instancia
+
+    Se crea con Producto(id, nombre, tipo_tela, talla, cantidad, color="N/A") o, desde
+    una fila del cursor, con Producto._make(fila). Para cambiar un campo se usa
+    producto._replace(cantidad=...).
+    """
+    __slots__ = ()
 
     def __str__(self):
         return f"{self.id:3} | {self.nombre:20} | {self.tipo_tela:12} | {self.talla:5} | {self.color:10} | {self.cantidad:5}"
 
     def to_dict(self):
         """Convierte el producto a diccionario"""
-        return {
-            "id": self.id,
-            "nombre": self.nombre,
-            "tipo_tela": self.tipo_tela,
-            "talla": self.talla,
-            "cantidad": self.cantidad,
-            "color": self.color
-        }
-    
+        return dict(zip(CAMPOS_PRODUCTO, self))
+
     @staticmethod
     def from_dict(data):
         """Crea un producto desde un diccionario"""
@@ -34,4 +33,4 @@ class Producto:
             data['talla'],
             data['cantidad'],
             data.get('color', 'N/A')
-        )
\ No newline at end of file
+        )